@@ -0,0 +1,56 @@
+import time
+import argparse
+
+from src.model_registry import get_model
+from src.summary_generation import build_summary_prompt, generate_batch, generate_assisted
+from src.benchmark_summary_backends import load_sample_items
+# l'import de sentiment_trend_analysis enregistre aussi text_generator / draft_model (summary_backends)
+from src.sentiment_trend_analysis import TREND_INPUT_FILE
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Décodage assisté (recherche dans le prompt, modèle brouillon) face au glouton classique"
+    )
+    parser.add_argument("--input", default=TREND_INPUT_FILE)
+    parser.add_argument("--passages", type=int, default=10, help="passages de contexte par synthèse")
+    parser.add_argument("--modes", nargs="+", choices=["prompt-lookup", "draft"], default=["prompt-lookup", "draft"])
+    args = parser.parse_args()
+
+    items = load_sample_items(args.input, args.passages)
+    if not items:
+        print(f"ERREUR: Aucun avis lisible dans {args.input}.")
+        return
+
+    generator = get_model("text_generator")
+    assistants = {"prompt-lookup": None}
+    if "draft" in args.modes:
+        assistants["draft"] = get_model("draft_model")
+
+    rows = []
+    for trends, sentiment_type, passages in items:
+        prompt = build_summary_prompt(trends, sentiment_type, passages)
+        start = time.perf_counter()
+        reference = generate_batch([prompt], generator.model, generator.tokenizer)[0]
+        reference_time = time.perf_counter() - start
+
+        for mode in args.modes:
+            texts, stats = generate_assisted(
+                [prompt], generator.model, generator.tokenizer, assistant_model=assistants[mode]
+            )
+            rows.append((
+                sentiment_type, mode, stats[0]["acceptance"], reference_time, stats[0]["seconds"],
+                texts[0] == reference
+            ))
+
+    print(f"{'synthèse':>9} {'mode':>14} {'acceptés':>9} {'glouton (s)':>12} {'assisté (s)':>12} {'accél.':>7} {'identique':>10}")
+    for sentiment_type, mode, acceptance, reference_time, assisted_time, same in rows:
+        shown = "indispo." if acceptance is None else f"{acceptance * 100:.1f}%"
+        print(
+            f"{sentiment_type:>9} {mode:>14} {shown:>9} {reference_time:>12.2f} "
+            f"{assisted_time:>12.2f} {reference_time / assisted_time:>6.2f}x {'oui' if same else 'NON':>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import os
+import time
+import argparse
+
+from src.camembert_inference import DEFAULT_BATCH_SIZE
+from src.camembert_parallel import start_worker_pool, warm_up_pool, classify_texts_parallel
+from src.review_store import read_table, STORE_DIR
+
+
+def load_sample_texts(path, limit):
+    # path None : avis du store Parquet (seule la colonne text est lue)
+    if path is None:
+        texts = read_table(["text"])["text"].to_pylist()
+        return [t.strip() for t in texts if t and t.strip()][:limit]
+    texts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) >= 7 and parts[-1].strip():
+                texts.append(parts[-1].strip())
+            if len(texts) >= limit:
+                break
+    return texts
+
+
+def candidate_splits(cores):
+    splits = []
+    workers = 1
+    while workers <= cores:
+        splits.append((workers, cores // workers))
+        workers *= 2
+    if splits[-1][0] != cores:
+        splits.append((cores, 1))
+    return splits
+
+
+def bench_split(texts, workers, threads, batch_size):
+    # le temps de chargement du modèle est exclu : on ne mesure que l'inférence, pool déjà chaud
+    pool = start_worker_pool(workers, threads)
+    try:
+        warm_up_pool(pool, workers)
+        start = time.perf_counter()
+        classify_texts_parallel(texts, pool, workers, batch_size=batch_size)
+        return time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit de DistilCamemBERT selon le découpage workers × threads")
+    parser.add_argument("--input", default=None, help="fichier TSV d'avis (par défaut : le store Parquet)")
+    parser.add_argument("--limit", type=int, default=2000, help="nombre d'avis utilisés pour la mesure")
+    parser.add_argument("--cores", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    texts = load_sample_texts(args.input, args.limit)
+    if not texts:
+        print(f"ERREUR: Aucun avis lisible dans {args.input or STORE_DIR}.")
+        return
+
+    print(f"Benchmark sur {len(texts)} avis, {args.cores} cœurs, batch de {args.batch_size}")
+    print(f"{'workers':>8} {'threads':>8} {'temps (s)':>10} {'avis/s':>10}")
+
+    results = []
+    for workers, threads in candidate_splits(args.cores):
+        elapsed = bench_split(texts, workers, threads, args.batch_size)
+        throughput = len(texts) / elapsed
+        results.append((throughput, workers, threads))
+        print(f"{workers:>8} {threads:>8} {elapsed:>10.2f} {throughput:>10.1f}")
+
+    best_throughput, best_workers, best_threads = max(results)
+    print(
+        f"✅ Meilleur découpage : --workers {best_workers} --threads-per-worker {best_threads} "
+        f"({best_throughput:.1f} avis/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import time
+import argparse
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src.sentiment_trend_analysis import TREND_INPUT_FILE, INPUT_COLUMNS, build_chunks, clean_text
+from src.summary_generation import generate_summaries
+
+# tendances fixes : seul le coût de génération est mesuré, pas l'extraction
+BENCH_TRENDS = ["qualité du service", "délais de traitement", "relation client"]
+SENTIMENTS = {"POSITIVE": "positifs", "NEGATIVE": "négatifs", "NEUTRAL": "neutres"}
+
+
+def load_sample_items(path, passages_per_summary):
+    df = pd.read_csv(path, sep="\t", header=None, names=INPUT_COLUMNS, dtype=str).dropna(subset=["text"])
+    df["clean_text"] = df["text"].apply(clean_text)
+    items = []
+    for sentiment, sentiment_type in SENTIMENTS.items():
+        chunks = build_chunks(df[df["sentiment"] == sentiment])
+        passages = [c["text"] for c in chunks[:passages_per_summary]]
+        if passages:
+            items.append((BENCH_TRENDS, sentiment_type, passages))
+    return items
+
+
+def _run_backend(name, options, items):
+    import resource
+    from src.summary_backends import get_backend
+
+    backend = get_backend(name, **options)
+    start = time.perf_counter()
+    backend.load()
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    summaries = generate_summaries(items, backend)
+    elapsed = time.perf_counter() - start
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return summaries, load_time, elapsed, max_rss_mb
+
+
+def parse_backend(spec):
+    # "hf", "stub", "llama-cpp:q4_k_m", "llama-cpp:q8_0"
+    name, _, quant = spec.partition(":")
+    return name, ({"quant": quant} if quant else {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence et mémoire des backends de synthèse sur les mêmes prompts")
+    parser.add_argument("--input", default=TREND_INPUT_FILE)
+    parser.add_argument("--passages", type=int, default=10, help="passages de contexte par synthèse")
+    parser.add_argument("--backends", nargs="+", default=["hf", "llama-cpp:q4_k_m", "llama-cpp:q8_0", "stub"])
+    args = parser.parse_args()
+
+    items = load_sample_items(args.input, args.passages)
+    if not items:
+        print(f"ERREUR: Aucun avis lisible dans {args.input}.")
+        return
+
+    # un processus neuf par backend pour que la mémoire résidente mesurée soit celle du backend seul
+    results = {}
+    ctx = mp.get_context("spawn")
+    for spec in args.backends:
+        name, options = parse_backend(spec)
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            results[spec] = pool.submit(_run_backend, name, options, items).result()
+
+    print(f"{len(items)} synthèses par backend")
+    print(f"{'backend':>18} {'chargement (s)':>15} {'génération (s)':>15} {'s/synthèse':>11} {'RSS max (Mo)':>13}")
+    for spec, (_, load_time, elapsed, rss) in results.items():
+        print(f"{spec:>18} {load_time:>15.2f} {elapsed:>15.2f} {elapsed / len(items):>11.2f} {rss:>13.0f}")
+
+    for k, (_, sentiment_type, _) in enumerate(items):
+        print(f"\n**Synthèse {sentiment_type}**")
+        for spec, (summaries, *_) in results.items():
+            print(f"- {spec} : {summaries[k]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import time
+import argparse
+
+from src.summary_backends import HFBackend
+from src.summary_generation import generate_summaries
+from src.benchmark_summary_backends import load_sample_items
+from src.sentiment_trend_analysis import TREND_INPUT_FILE, rag_generate_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Synthèses générées en un lot complété à gauche face au pipeline, une par une : même texte ?"
+    )
+    parser.add_argument("--input", default=TREND_INPUT_FILE)
+    parser.add_argument("--passages", type=int, default=10, help="passages de contexte par synthèse")
+    args = parser.parse_args()
+
+    items = load_sample_items(args.input, args.passages)
+    if not items:
+        print(f"ERREUR: Aucun avis lisible dans {args.input}.")
+        return
+
+    backend = HFBackend(assisted="none")
+    backend.load()
+
+    # sans cache : chaque chemin génère réellement ses synthèses
+    start = time.perf_counter()
+    sequential = [rag_generate_summary(*item) for item in items]
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = generate_summaries(items, backend)
+    batch_time = time.perf_counter() - start
+
+    print(f"{len(items)} synthèses : séquentiel {sequential_time:.2f} s, lot {batch_time:.2f} s "
+          f"({sequential_time / batch_time:.2f}x)")
+    differences = 0
+    for (_, sentiment_type, _), reference, text in zip(items, sequential, batched):
+        same = text == reference
+        differences += not same
+        print(f"{sentiment_type:>9} : {'identique' if same else 'DIFFÉRENT'}")
+        if not same:
+            print(f"  séquentiel : {reference}\n  lot        : {text}")
+    if differences:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import time
+import argparse
+
+import numpy as np
+import faiss
+
+from src.vector_store import VectorStore, index_params, make_index, set_search_params, can_build, normalize
+
+
+def benchmark_configs(args):
+    ivf = {"nlist": args.nlist}
+    return [
+        ("flat", {}),
+        *[("ivf_flat", {**ivf, "nprobe": p}) for p in args.nprobe],
+        *[("ivf_pq", {**ivf, "m": args.pq_m, "nbits": args.pq_nbits, "nprobe": p}) for p in args.nprobe],
+        *[("hnsw", {"M": args.hnsw_m, "ef_construction": args.ef_construction, "ef_search": ef})
+          for ef in args.ef_search],
+    ]
+
+
+def load_vectors(args):
+    store = VectorStore()
+    found = store._load_embeddings()
+    store.close()
+    if found:
+        vectors = np.vstack(list(found.values()))
+        print(f"{len(vectors)} embeddings chargés depuis le vector store")
+    else:
+        print(f"Vector store vide : {args.synthetic} vecteurs aléatoires de dimension {args.dim}")
+        vectors = np.random.default_rng(0).normal(size=(args.synthetic, args.dim)).astype(np.float32)
+    return normalize(vectors)
+
+
+SEARCH_PARAMS = ("nprobe", "ef_search")
+
+
+def recall_at_k(found_ids, truth_ids):
+    hits = [len(set(f) & set(t)) / len(t) for f, t in zip(found_ids.tolist(), truth_ids.tolist())]
+    return float(np.mean(hits))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k, latence et mémoire des index FAISS face à l'index exact")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=500, help="vecteurs mis de côté pour servir de requêtes")
+    parser.add_argument("--synthetic", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--pq-m", type=int, default=64)
+    parser.add_argument("--pq-nbits", type=int, default=8)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 128])
+    args = parser.parse_args()
+
+    vectors = load_vectors(args)
+    rng = np.random.default_rng(1)
+    order = rng.permutation(len(vectors))
+    queries = vectors[order[:args.queries]]
+    database = vectors[order[args.queries:]]
+    ids = np.arange(len(database), dtype=np.int64)
+    k = min(args.k, len(database))
+
+    truth = None
+    built = {}
+    print(f"{'index':>9} {'paramètres':<56} {'build (s)':>9} {'recall@' + str(k):>9} {'ms/req':>8} {'mémoire (Mo)':>12}")
+    for index_type, overrides in benchmark_configs(args):
+        params = index_params(index_type, overrides)
+        if not can_build(index_type, params, len(database)):
+            print(f"{index_type:>9} {str(overrides):<56} trop peu de vecteurs, ignoré")
+            continue
+
+        # un même index sert à toutes les valeurs de nprobe / ef_search
+        build_key = (index_type, tuple(sorted((p, v) for p, v in params.items() if p not in SEARCH_PARAMS)))
+        if build_key not in built:
+            start = time.perf_counter()
+            index = make_index(index_type, params, database)
+            index.add_with_ids(database, ids)
+            built[build_key] = (index, time.perf_counter() - start)
+        index, build_time = built[build_key]
+        set_search_params(index, index_type, params)
+
+        # requêtes une par une, pire cas de latence par requête
+        start = time.perf_counter()
+        found = np.vstack([index.search(q[None, :], k)[1] for q in queries])
+        latency_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        if truth is None:
+            truth = found
+        memory_mb = faiss.serialize_index(index).nbytes / 1024 / 1024
+        print(
+            f"{index_type:>9} {str(overrides):<56} {build_time:>9.2f} "
+            f"{recall_at_k(found, truth):>9.3f} {latency_ms:>8.3f} {memory_mb:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import os
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+from src.model_registry import register_model, get_model
+
+MODEL_NAME = "cmarkea/distilcamembert-base-sentiment"
+MAX_TOKENS = 512
+DEFAULT_BATCH_SIZE = 32
+
+# "torch" : modèle HF fp32 ; "onnx-int8" : export ONNX quantifié int8 exécuté par ONNX Runtime
+ENGINES = ("torch", "onnx-int8")
+DEFAULT_ENGINE = os.environ.get("CAMEMBERT_ENGINE", "torch")
+
+# label du modèle ("1 star" ... "5 stars") → sentiment, testé dans cet ordre ; sinon NEUTRAL
+LABEL_MAPPING = {"5": "POSITIVE", "4": "POSITIVE", "2": "NEGATIVE", "1": "NEGATIVE"}
+
+
+def _sentiment_loader(engine):
+    def load():
+        if engine == "torch":
+            tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+            model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
+            model.eval()
+        else:
+            from src.camembert_onnx import load_onnx_model
+            tokenizer, model = load_onnx_model()
+        return tokenizer, model
+    return load
+
+
+# passer par le registre : un même processus (ex: src.pipeline) ne charge le modèle qu'une fois
+for _engine in ENGINES:
+    register_model(f"camembert_{_engine}", _sentiment_loader(_engine))
+
+
+def load_sentiment_model(engine=DEFAULT_ENGINE):
+    if engine not in ENGINES:
+        raise ValueError(f"Moteur d'inférence inconnu : {engine} (attendu : {', '.join(ENGINES)})")
+    return get_model(f"camembert_{engine}")
+
+
+def map_label(label):
+    for stars, sentiment in LABEL_MAPPING.items():
+        if stars in label:
+            return sentiment
+    return "NEUTRAL"
+
+
+def classify_texts(texts, batch_size=DEFAULT_BATCH_SIZE, engine=DEFAULT_ENGINE):
+    if not texts:
+        return []
+
+    tokenizer, model = load_sentiment_model(engine)
+    encodings = tokenizer(list(texts), truncation=True, max_length=MAX_TOKENS)["input_ids"]
+
+    # tri par longueur : chaque batch est paddé à la longueur de son plus long avis
+    order = sorted(range(len(encodings)), key=lambda i: len(encodings[i]))
+    id2label = model.config.id2label
+    sentiments = [None] * len(encodings)
+
+    with torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            batch_ids = order[start:start + batch_size]
+            batch = tokenizer.pad(
+                {"input_ids": [encodings[i] for i in batch_ids]},
+                padding="longest",
+                return_tensors="pt"
+            )
+            logits = model(**batch).logits
+            for i, pred in zip(batch_ids, logits.argmax(dim=-1).tolist()):
+                sentiments[i] = map_label(id2label[pred])
+
+    return sentiments
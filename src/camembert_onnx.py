@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import argparse
+import multiprocessing as mp
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import torch
+import onnxruntime as ort
+from transformers import AutoTokenizer
+from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+from src.camembert_inference import MODEL_NAME, DEFAULT_BATCH_SIZE
+from src.benchmark_camembert_workers import load_sample_texts
+from src.review_store import STORE_DIR
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ONNX_DIR = os.path.join(BASE_DIR, "models", "distilcamembert-base-sentiment-onnx")
+QUANTIZED_FILE = "model_quantized.onnx"
+
+
+def export_onnx_int8(output_dir=ONNX_DIR):
+    print(f"Export ONNX de {MODEL_NAME} vers {output_dir}")
+    model = ORTModelForSequenceClassification.from_pretrained(MODEL_NAME, export=True)
+    model.save_pretrained(output_dir)
+    AutoTokenizer.from_pretrained(MODEL_NAME).save_pretrained(output_dir)
+
+    # quantification dynamique : poids en int8, activations quantifiées à la volée
+    quantizer = ORTQuantizer.from_pretrained(output_dir, file_name="model.onnx")
+    qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+    quantizer.quantize(save_dir=output_dir, quantization_config=qconfig)
+    print(f"✅ Modèle quantifié int8 écrit dans {os.path.join(output_dir, QUANTIZED_FILE)}")
+
+
+def load_onnx_model(model_dir=ONNX_DIR):
+    if not os.path.exists(os.path.join(model_dir, QUANTIZED_FILE)):
+        export_onnx_int8(model_dir)
+
+    session_options = ort.SessionOptions()
+    # même nombre de threads que torch : respecte --threads-per-worker en mode multi-processus
+    session_options.intra_op_num_threads = torch.get_num_threads()
+    session_options.inter_op_num_threads = 1
+
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = ORTModelForSequenceClassification.from_pretrained(
+        model_dir,
+        file_name=QUANTIZED_FILE,
+        session_options=session_options
+    )
+    return tokenizer, model
+
+
+def _run_engine(engine, texts, batch_size):
+    import resource
+    from src.camembert_inference import classify_texts, load_sentiment_model
+
+    load_sentiment_model(engine)
+    start = time.perf_counter()
+    sentiments = classify_texts(texts, batch_size=batch_size, engine=engine)
+    elapsed = time.perf_counter() - start
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return sentiments, elapsed, max_rss_mb
+
+
+def run_parity_check(texts, batch_size=DEFAULT_BATCH_SIZE):
+    # un processus neuf par moteur pour que la mémoire résidente mesurée soit celle du moteur seul
+    results = {}
+    ctx = mp.get_context("spawn")
+    for engine in ("torch", "onnx-int8"):
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            results[engine] = pool.submit(_run_engine, engine, texts, batch_size).result()
+
+    ref_labels, ref_time, ref_rss = results["torch"]
+    onnx_labels, onnx_time, onnx_rss = results["onnx-int8"]
+
+    agree = sum(1 for a, b in zip(ref_labels, onnx_labels) if a == b)
+    disagreements = Counter((a, b) for a, b in zip(ref_labels, onnx_labels) if a != b)
+
+    print(f"Parité sur {len(texts)} avis de référence")
+    print(f"Accord des labels : {agree}/{len(texts)} ({agree / len(texts) * 100:.2f}%)")
+    for (ref, got), count in disagreements.most_common():
+        print(f"  torch={ref} → onnx-int8={got} : {count}")
+    print(f"{'moteur':>10} {'temps (s)':>10} {'avis/s':>10} {'RSS max (Mo)':>13}")
+    print(f"{'torch':>10} {ref_time:>10.2f} {len(texts) / ref_time:>10.1f} {ref_rss:>13.0f}")
+    print(f"{'onnx-int8':>10} {onnx_time:>10.2f} {len(texts) / onnx_time:>10.1f} {onnx_rss:>13.0f}")
+    print(f"Accélération : x{ref_time / onnx_time:.2f}")
+    return agree / len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export ONNX int8 de DistilCamemBERT et contrôle de parité")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("export", help="exporte et quantifie le modèle dans models/")
+    parity = sub.add_parser("parity", help="compare les labels ONNX int8 à ceux de PyTorch")
+    parity.add_argument("--input", default=None, help="fichier TSV d'avis (par défaut : le store Parquet)")
+    parity.add_argument("--limit", type=int, default=1000)
+    parity.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx_int8()
+        return
+
+    texts = load_sample_texts(args.input, args.limit)
+    if not texts:
+        print(f"ERREUR: Aucun avis lisible dans {args.input or STORE_DIR}.")
+        sys.exit(1)
+    run_parity_check(texts, batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import math
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import torch
+
+from src.camembert_inference import classify_texts, load_sentiment_model, DEFAULT_BATCH_SIZE, DEFAULT_ENGINE
+
+
+_ready_barrier = None
+READY_TIMEOUT = 600
+
+
+def _init_worker(threads_per_worker, worker_counter, ready_barrier, engine):
+    global _ready_barrier
+    _ready_barrier = ready_barrier
+    with worker_counter.get_lock():
+        worker_index = worker_counter.value
+        worker_counter.value += 1
+
+    # chaque worker reçoit son propre bloc de cœurs pour éviter que les threads intra-op se marchent dessus
+    if hasattr(os, "sched_setaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+        start = (worker_index * threads_per_worker) % len(cpus)
+        pinned = cpus[start:start + threads_per_worker]
+        if pinned:
+            os.sched_setaffinity(0, pinned)
+
+    torch.set_num_threads(threads_per_worker)
+    torch.set_num_interop_threads(1)
+    load_sentiment_model(engine)
+
+
+def _worker_ready(_):
+    # bloque jusqu'à ce que `workers` tâches tournent en même temps : chacune occupe donc un
+    # processus distinct, qui a forcément terminé son initializer (chargement du modèle)
+    _ready_barrier.wait(READY_TIMEOUT)
+    return os.getpid()
+
+
+def _classify_shard(shard):
+    texts, batch_size, engine = shard
+    return classify_texts(texts, batch_size=batch_size, engine=engine)
+
+
+def start_worker_pool(workers, threads_per_worker, engine=DEFAULT_ENGINE):
+    # spawn : chaque worker charge DistilCamemBERT une seule fois, sans hériter de l'état torch du parent
+    ctx = mp.get_context("spawn")
+    worker_counter = ctx.Value("i", 0)
+    # les primitives de synchronisation ne passent que par héritage, d'où initargs
+    ready_barrier = ctx.Barrier(workers)
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(threads_per_worker, worker_counter, ready_barrier, engine)
+    )
+
+
+def warm_up_pool(pool, workers):
+    # une tâche par worker, synchronisées par une barrière : rend la main quand tous les processus
+    # sont démarrés et ont chargé le modèle
+    return sorted(pool.map(_worker_ready, range(workers)))
+
+
+def default_threads_per_worker(workers):
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def classify_texts_parallel(texts, pool, workers, batch_size=DEFAULT_BATCH_SIZE, engine=DEFAULT_ENGINE):
+    if not texts:
+        return []
+
+    shard_size = max(batch_size, math.ceil(len(texts) / workers))
+    shards = [(texts[i:i + shard_size], batch_size, engine) for i in range(0, len(texts), shard_size)]
+
+    # pool.map rend les résultats dans l'ordre des shards, donc dans l'ordre d'origine
+    sentiments = []
+    for shard_sentiments in pool.map(_classify_shard, shards):
+        sentiments.extend(shard_sentiments)
+    return sentiments
@@ -4,4 +4,17 @@ from dotenv import load_dotenv
 load_dotenv() 
 
 YELP_API_KEY = os.environ.get("YELP_API_KEY", "")
-BASE_YELP_URL = "https://api.yelp.com/v3"
\ No newline at end of file
+# racine de l'API Yelp Fusion ; un serveur local de test peut la remplacer
+BASE_YELP_URL = os.environ.get("BASE_YELP_URL", "https://api.yelp.com/v3")
+# pages publiques des restaurants, lues par Selenium (src/scrape.py)
+YELP_WEB_BASE_URL = os.environ.get("YELP_WEB_BASE_URL", "https://www.yelp.com")
+# racine des pages d'avis ; un serveur local de pages de test peut la remplacer
+TRUSTPILOT_BASE_URL = os.environ.get("TRUSTPILOT_BASE_URL", "https://fr.trustpilot.com")
+
+# index FAISS du RAG : flat, ivf_flat, ivf_pq ou hnsw ; paramètres en JSON, ex: {"nlist": 1024, "nprobe": 16}
+VECTOR_INDEX_TYPE = os.environ.get("VECTOR_INDEX_TYPE", "flat")
+VECTOR_INDEX_PARAMS = os.environ.get("VECTOR_INDEX_PARAMS", "{}")
+
+# service d'inférence local (python -m src.inference_service), ex: http://127.0.0.1:8790 ;
+# vide : chaque script charge ses propres modèles
+INFERENCE_SERVICE_URL = os.environ.get("INFERENCE_SERVICE_URL", "")
@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import sqlite3
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_FILE = os.path.join(BASE_DIR, "crawl_state.sqlite")
+
+
+class CrawlState:
+    # avis déjà enregistrés et historique des collectes, par domaine
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS reviews ("
+            "domain TEXT NOT NULL, review_id TEXT NOT NULL, published TEXT, first_seen REAL NOT NULL, "
+            "PRIMARY KEY (domain, review_id))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS crawls ("
+            "domain TEXT NOT NULL, started_at REAL NOT NULL, mode TEXT NOT NULL, "
+            "pages INTEGER NOT NULL, new_reviews INTEGER NOT NULL)"
+        )
+        # avancement dans l'historique : toutes les pages avant next_page ont été lues d'affilée
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS backfill ("
+            "domain TEXT PRIMARY KEY, next_page INTEGER NOT NULL, complete INTEGER NOT NULL)"
+        )
+        self.conn.commit()
+
+    def known_ids(self, domain):
+        return {row[0] for row in self.conn.execute("SELECT review_id FROM reviews WHERE domain = ?", (domain,))}
+
+    def add_reviews(self, domain, reviews):
+        # reviews : dicts {"review_id", "published"} ; les ids déjà connus sont ignorés
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO reviews (domain, review_id, published, first_seen) VALUES (?, ?, ?, ?)",
+            [(domain, r["review_id"], r.get("published", ""), now) for r in reviews]
+        )
+        self.conn.commit()
+
+    def record_crawl(self, domain, started_at, mode, pages, new_reviews):
+        self.conn.execute(
+            "INSERT INTO crawls (domain, started_at, mode, pages, new_reviews) VALUES (?, ?, ?, ?, ?)",
+            (domain, started_at, mode, pages, new_reviews)
+        )
+        self.conn.commit()
+
+    def backfill(self, domain):
+        # (première page restant à lire, historique complet ?) ; un domaine collecté avant le suivi
+        # de l'avancement est repris depuis le début, les avis déjà connus restant filtrés
+        row = self.conn.execute("SELECT next_page, complete FROM backfill WHERE domain = ?", (domain,)).fetchone()
+        return (row[0], bool(row[1])) if row else (1, False)
+
+    def set_backfill(self, domain, next_page, complete):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO backfill (domain, next_page, complete) VALUES (?, ?, ?)",
+            (domain, next_page, int(complete))
+        )
+        self.conn.commit()
+
+    def has_crawled(self, domain):
+        return self.conn.execute("SELECT 1 FROM crawls WHERE domain = ? LIMIT 1", (domain,)).fetchone() is not None
+
+    def reset(self, domain):
+        removed = self.conn.execute("DELETE FROM reviews WHERE domain = ?", (domain,)).rowcount
+        self.conn.execute("DELETE FROM crawls WHERE domain = ?", (domain,))
+        self.conn.execute("DELETE FROM backfill WHERE domain = ?", (domain,))
+        self.conn.commit()
+        return removed
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("stats", "reset") or (sys.argv[1] == "reset" and len(sys.argv) < 3):
+        print("Usage: python -m src.crawl_state <stats|reset <domaine>>")
+        print("  reset : oublie les avis connus du domaine, la prochaine collecte sera complète")
+        sys.exit(1)
+
+    state = CrawlState()
+    if sys.argv[1] == "stats":
+        rows = state.conn.execute(
+            "SELECT r.domain, COUNT(*), MAX(r.published), "
+            "(SELECT MAX(started_at) FROM crawls c WHERE c.domain = r.domain) "
+            "FROM reviews r GROUP BY r.domain ORDER BY r.domain"
+        ).fetchall()
+        if not rows:
+            print(f"Aucun domaine collecté dans {state.path}")
+        for domain, count, newest, last_crawl in rows:
+            last = time.strftime("%Y-%m-%d %H:%M", time.localtime(last_crawl)) if last_crawl else "-"
+            next_page, complete = state.backfill(domain)
+            history = "historique complet" if complete else f"historique à reprendre page {next_page}"
+            print(f"{domain} : {count} avis connus, plus récent publié le {newest or '-'}, "
+                  f"dernière collecte {last}, {history}")
+    else:
+        removed = state.reset(sys.argv[2])
+        print(f"✅ {removed} avis oubliés pour {sys.argv[2]}")
+    state.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import time
+
+import torch
+import transformers
+from packaging.version import Version
+from transformers import StoppingCriteria
+from transformers.generation.streamers import BaseStreamer
+
+from src.summary_generation import MAX_SUMMARY_SENTENCES, count_completed_sentences
+
+# versions de transformers où _get_candidate_generator (privé) renvoie un générateur dont
+# get_candidates(input_ids) rend (candidate_ids, candidate_logits) ; hors de cet intervalle
+# le comptage est désactivé et le taux d'acceptation est indisponible
+CANDIDATE_COUNTER_VERSIONS = (Version("4.38"), Version("5.0"))
+
+
+class SentenceLimitCriteria(StoppingCriteria):
+    # arrête chaque ligne du batch dès qu'elle contient max_sentences phrases terminées
+    def __init__(self, tokenizer, prompt_length, max_sentences=MAX_SUMMARY_SENTENCES):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.max_sentences = max_sentences
+        self.stopped = []
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if not self.stopped:
+            self.stopped = [False] * input_ids.shape[0]
+        for row, tokens in enumerate(input_ids[:, self.prompt_length:].tolist()):
+            if self.stopped[row] or not tokens:
+                continue
+            # décodage complet seulement quand le dernier token peut fermer une phrase
+            if "." not in self.tokenizer.decode(tokens[-1:]):
+                continue
+            text = self.tokenizer.decode(tokens, skip_special_tokens=True)
+            if count_completed_sentences(text) >= self.max_sentences:
+                self.stopped[row] = True
+        return torch.tensor(self.stopped, dtype=torch.bool, device=input_ids.device)
+
+
+class SentenceStreamer(BaseStreamer):
+    # affiche l'avancement phrase par phrase pendant le décodage (batch de taille 1)
+    def __init__(self, tokenizer, max_new_tokens, max_sentences=MAX_SUMMARY_SENTENCES):
+        self.tokenizer = tokenizer
+        self.max_new_tokens = max_new_tokens
+        self.max_sentences = max_sentences
+        self.tokens = []
+        self.sentences = 0
+        self.start = None
+
+    def put(self, value):
+        if self.start is None:
+            # premier appel : le prompt, qui n'est pas du texte généré
+            self.start = time.perf_counter()
+            return
+        self.tokens.extend(value.reshape(-1).tolist())
+        completed = count_completed_sentences(self.tokenizer.decode(self.tokens, skip_special_tokens=True))
+        if completed > self.sentences:
+            self.sentences = completed
+            print(f"DEBUG: {completed}/{self.max_sentences} phrases après {len(self.tokens)} tokens")
+
+    def end(self):
+        elapsed = time.perf_counter() - self.start if self.start is not None else 0.0
+        report_generation(
+            [len(self.tokens)], [self.sentences >= self.max_sentences], self.max_new_tokens, elapsed
+        )
+
+
+class CandidateCounter:
+    # compte les tokens proposés par le générateur de candidats (modèle brouillon ou
+    # recherche dans le prompt) pendant un generate assisté ; chaque itération vérifie
+    # les candidats et ajoute les acceptés + 1 token du modèle cible.
+    # Repose sur une méthode privée de transformers : si elle manque ou si la version n'a pas
+    # été vérifiée, generate tourne sans comptage et acceptance_rate renvoie None.
+    def __init__(self, model):
+        self.model = model
+        self.proposed = 0
+        self.iterations = 0
+        low, high = CANDIDATE_COUNTER_VERSIONS
+        self.available = (
+            hasattr(model, "_get_candidate_generator")
+            and low <= Version(transformers.__version__) < high
+        )
+
+    def __enter__(self):
+        if not self.available:
+            return self
+        original = self.model._get_candidate_generator
+
+        def counting_candidate_generator(*args, **kwargs):
+            generator = original(*args, **kwargs)
+            get_candidates = generator.get_candidates
+
+            def counted(input_ids, *a, **kw):
+                candidate_ids, candidate_logits = get_candidates(input_ids, *a, **kw)
+                self.proposed += candidate_ids.shape[1] - input_ids.shape[1]
+                self.iterations += 1
+                return candidate_ids, candidate_logits
+
+            generator.get_candidates = counted
+            return generator
+
+        self.model._get_candidate_generator = counting_candidate_generator
+        return self
+
+    def __exit__(self, *exc):
+        if self.available:
+            del self.model._get_candidate_generator
+
+    def acceptance_rate(self, generated):
+        if not self.available:
+            return None
+        accepted = max(0, generated - self.iterations)
+        return accepted / self.proposed if self.proposed else 0.0
+
+
+def report_generation(generated, stopped, max_new_tokens, elapsed):
+    # generated : tokens générés par ligne ; stopped : ligne arrêtée par la limite de phrases
+    total = sum(generated)
+    saved = sum(max_new_tokens - n for n, stop in zip(generated, stopped) if stop)
+    rate = total / elapsed if elapsed > 0 else 0.0
+    print(
+        f"DEBUG: Génération : {total} tokens en {elapsed:.1f} s ({rate:.1f} tokens/s), "
+        f"jusqu'à {saved} tokens évités par l'arrêt à {MAX_SUMMARY_SENTENCES} phrases"
+    )
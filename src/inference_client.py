@@ -0,0 +1,84 @@
+import base64
+import threading
+
+import numpy as np
+import requests
+
+from src import config
+
+# une synthèse Llama sur CPU peut prendre plusieurs minutes
+DEFAULT_TIMEOUT = 900
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def service_url():
+    return (config.INFERENCE_SERVICE_URL or "").rstrip("/")
+
+
+def enabled():
+    # les scripts passent par le service dès que INFERENCE_SERVICE_URL est renseignée
+    return bool(service_url())
+
+
+def _get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        return _session
+
+
+def _request(method, endpoint, payload=None):
+    response = _get_session().request(
+        method, f"{service_url()}/{endpoint}", json=payload, timeout=DEFAULT_TIMEOUT
+    )
+    if response.status_code >= 400:
+        try:
+            detail = response.json().get("error", response.text)
+        except ValueError:
+            detail = response.text
+        raise RuntimeError(f"Service d'inférence : {endpoint} → {response.status_code} {detail}")
+    return response.json()
+
+
+def decode_array(payload):
+    data = base64.b64decode(payload["data"])
+    return np.frombuffer(data, dtype=payload["dtype"]).reshape(payload["shape"])
+
+
+def encode_array(array):
+    array = np.ascontiguousarray(array)
+    return {"dtype": str(array.dtype), "shape": list(array.shape), "data": base64.b64encode(array.tobytes()).decode()}
+
+
+def health():
+    return _request("GET", "health")
+
+
+def classify(texts):
+    return _request("POST", "classify", {"texts": list(texts)})["sentiments"]
+
+
+def embed(texts):
+    return decode_array(_request("POST", "embed", {"texts": list(texts)})["embeddings"])
+
+
+def extract_keywords(texts):
+    # (mots-clés YAKE, mots-clés KeyBERT), une liste par texte
+    body = _request("POST", "extract-keywords", {"texts": list(texts)})
+    return body["yake"], body["keybert"]
+
+
+def summarize(prompts):
+    return _request("POST", "summarize", {"prompts": list(prompts)})["texts"]
+
+
+class RemoteEncoder:
+    # même interface que SentenceTransformer.encode pour les appelants existants
+    # (KeyBERT, vector store, requêtes du RAG) ; les vecteurs sont calculés par le service
+    def encode(self, sentences, batch_size=None, convert_to_numpy=True, convert_to_tensor=False, **kwargs):
+        single = isinstance(sentences, str)
+        embeddings = embed([sentences] if single else list(sentences))
+        return embeddings[0] if single else embeddings
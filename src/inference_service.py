@@ -0,0 +1,293 @@
+import json
+import time
+import queue
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from src import config
+
+# le service calcule lui-même : INFERENCE_SERVICE_URL (ex: depuis .env) ne doit pas le renvoyer vers lui-même
+config.INFERENCE_SERVICE_URL = ""
+
+from src.model_registry import get_model, is_loaded, load_times  # noqa: E402
+from src.inference_client import encode_array  # noqa: E402
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8790
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 10
+# les trois synthèses d'une analyse tiennent dans un lot
+DEFAULT_SUMMARY_BATCH_SIZE = 3
+
+
+class InvalidRequest(Exception):
+    # corps de requête mal formé : réponse 400, contrairement aux erreurs des modèles (500)
+    pass
+
+
+class MicroBatcher:
+    # regroupe les requêtes concurrentes d'un endpoint : un lot part dès `max_batch_size` éléments,
+    # ou `max_wait` secondes après l'arrivée du premier ; un seul thread appelle `fn`
+    def __init__(self, name, fn, max_batch_size, max_wait):
+        self.name = name
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.pending = queue.Queue()
+        # requête qui aurait fait déborder le lot précédent : ouvre le suivant
+        self.carried = None
+        self.batches = 0
+        self.items = 0
+        self.busy_seconds = 0.0
+        threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True).start()
+
+    def submit(self, items):
+        # bloque jusqu'au résultat, dans l'ordre des éléments soumis
+        request = {"items": list(items), "done": threading.Event(), "results": None, "error": None}
+        if not request["items"]:
+            return []
+        self.pending.put(request)
+        request["done"].wait()
+        if request["error"] is not None:
+            raise request["error"]
+        return request["results"]
+
+    def _collect(self):
+        requests = [self.carried or self.pending.get()]
+        self.carried = None
+        count = len(requests[0]["items"])
+        deadline = time.monotonic() + self.max_wait
+        while count < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if count + len(request["items"]) > self.max_batch_size:
+                self.carried = request
+                break
+            requests.append(request)
+            count += len(request["items"])
+        return requests
+
+    def _call(self, items):
+        # une requête plus grosse que le lot maximal est découpée, pas refusée
+        results = []
+        for offset in range(0, len(items), self.max_batch_size):
+            results.extend(self.fn(items[offset:offset + self.max_batch_size]))
+            self.batches += 1
+        return results
+
+    def _run(self):
+        while True:
+            requests = self._collect()
+            items = [item for request in requests for item in request["items"]]
+            start = time.perf_counter()
+            try:
+                results = self._call(items)
+            except Exception as e:
+                if len(requests) == 1:
+                    requests[0]["error"] = e
+                else:
+                    # l'erreur d'une requête (ex: textes sans vocabulaire pour KeyBERT) ne doit pas
+                    # faire échouer celles regroupées avec elle : chacune est relancée seule
+                    for request in requests:
+                        try:
+                            request["results"] = self._call(request["items"])
+                        except Exception as request_error:
+                            request["error"] = request_error
+            else:
+                offset = 0
+                for request in requests:
+                    request["results"] = results[offset:offset + len(request["items"])]
+                    offset += len(request["items"])
+            self.busy_seconds += time.perf_counter() - start
+            self.items += len(items)
+            for request in requests:
+                request["done"].set()
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch": round(self.items / self.batches, 2) if self.batches else 0,
+            "busy_seconds": round(self.busy_seconds, 2),
+        }
+
+
+def _strings(body, field):
+    values = body.get(field) if isinstance(body, dict) else None
+    if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+        raise InvalidRequest(f"`{field}` doit être une liste de chaînes")
+    return values
+
+
+class InferenceService:
+    def __init__(self, engine, backend, max_batch_size, max_wait, summary_batch_size):
+        # imports ici : ils enregistrent les modèles (encodeur, spaCy, Llama...) dans le registre
+        from src import camembert_inference, keyphrase_batch, sentiment_trend_analysis  # noqa: F401
+
+        self.engine = engine
+        self.backend = backend
+        self.batchers = {
+            "classify": MicroBatcher("classify", self._classify, max_batch_size, max_wait),
+            "embed": MicroBatcher("embed", self._embed, max_batch_size, max_wait),
+            "extract-keywords": MicroBatcher("extract-keywords", self._extract_keywords, max_batch_size, max_wait),
+            "summarize": MicroBatcher("summarize", self._summarize, summary_batch_size, max_wait),
+        }
+
+    def warm_up(self, endpoints):
+        from src.camembert_inference import load_sentiment_model
+        if "classify" in endpoints:
+            load_sentiment_model(self.engine)
+        if "embed" in endpoints or "extract-keywords" in endpoints:
+            get_model("encoder")
+        if "summarize" in endpoints:
+            self.backend.load()
+
+    def _classify(self, texts):
+        from src.camembert_inference import classify_texts
+        return classify_texts(texts, engine=self.engine)
+
+    def _embed(self, texts):
+        embeddings = np.asarray(get_model("encoder").encode(texts, convert_to_numpy=True), dtype=np.float32)
+        return list(embeddings)
+
+    def _extract_keywords(self, texts):
+        # le vocabulaire candidat de KeyBERT est propre à chaque texte : regrouper les requêtes
+        # ne change pas les mots-clés d'un texte
+        from src.keyphrase_batch import extract_yake_batch, extract_keybert_batch
+        yake_kws = extract_yake_batch(texts)
+        keybert_kws = extract_keybert_batch(texts, get_model("encoder"))
+        return list(zip(yake_kws, keybert_kws))
+
+    def _summarize(self, prompts):
+        return self.backend.generate(prompts)
+
+    def handle(self, endpoint, body):
+        if endpoint == "classify":
+            return {"sentiments": self.batchers["classify"].submit(_strings(body, "texts"))}
+        if endpoint == "embed":
+            rows = self.batchers["embed"].submit(_strings(body, "texts"))
+            return {"embeddings": encode_array(np.stack(rows) if rows else np.zeros((0, 0), np.float32))}
+        if endpoint == "extract-keywords":
+            pairs = self.batchers["extract-keywords"].submit(_strings(body, "texts"))
+            return {"yake": [p[0] for p in pairs], "keybert": [p[1] for p in pairs]}
+        if endpoint == "summarize":
+            return {"texts": self.batchers["summarize"].submit(_strings(body, "prompts")), "model_id": self.backend.model_id}
+        raise KeyError(endpoint)
+
+    def health(self):
+        return {
+            "summary_backend": self.backend.name,
+            "summary_model_id": self.backend.model_id,
+            "summary_generation_kwargs": self.backend.generation_kwargs,
+            "sentiment_engine": self.engine,
+            "models": {name: round(seconds, 2) for name, seconds in load_times.items() if is_loaded(name)},
+            "batchers": {name: batcher.stats() for name, batcher in self.batchers.items()},
+        }
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _reply(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/health":
+                self._reply(200, service.health())
+            else:
+                self._reply(404, {"error": f"endpoint inconnu : {self.path}"})
+
+        def do_POST(self):
+            endpoint = self.path.strip("/")
+            if endpoint not in service.batchers:
+                self._reply(404, {"error": f"endpoint inconnu : {self.path}"})
+                return
+            try:
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                except ValueError as e:
+                    raise InvalidRequest(f"JSON illisible ({e})")
+                self._reply(200, service.handle(endpoint, body))
+            except InvalidRequest as e:
+                self._reply(400, {"error": f"requête invalide : {e}"})
+            except Exception as e:
+                # erreur côté modèle, y compris ValueError : ce n'est pas la faute du client
+                self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def parse_args(argv=None):
+    from src.camembert_inference import ENGINES, DEFAULT_ENGINE
+    from src.summary_backends import (
+        BACKENDS, DEFAULT_BACKEND, GGUF_FILES, DEFAULT_GGUF_QUANT, ASSISTED_MODES, DEFAULT_ASSISTED_MODE
+    )
+
+    parser = argparse.ArgumentParser(description="Service local qui garde les modèles chargés entre les appels")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help="textes au plus par lot (classify, embed, extract-keywords)")
+    parser.add_argument("--summary-batch-size", type=int, default=DEFAULT_SUMMARY_BATCH_SIZE,
+                        help="prompts au plus par lot de génération")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS,
+                        help="attente maximale d'autres requêtes avant de lancer un lot incomplet")
+    parser.add_argument("--engine", choices=ENGINES, default=DEFAULT_ENGINE)
+    parser.add_argument("--summary-backend", choices=[b for b in BACKENDS if b != "remote"],
+                        default=DEFAULT_BACKEND if DEFAULT_BACKEND != "remote" else "hf")
+    parser.add_argument("--gguf-quant", choices=list(GGUF_FILES), default=DEFAULT_GGUF_QUANT)
+    parser.add_argument("--assisted-decoding", choices=ASSISTED_MODES, default=DEFAULT_ASSISTED_MODE)
+    parser.add_argument("--warm", nargs="*", default=["classify", "embed", "extract-keywords"],
+                        choices=["classify", "embed", "extract-keywords", "summarize"],
+                        help="modèles chargés au démarrage (les autres au premier appel)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from src.summary_backends import get_backend
+
+    args = parse_args(argv)
+    options = {}
+    if args.summary_backend == "llama-cpp":
+        options = {"quant": args.gguf_quant}
+    elif args.summary_backend == "hf":
+        options = {"assisted": args.assisted_decoding}
+    service = InferenceService(
+        args.engine, get_backend(args.summary_backend, **options),
+        args.max_batch_size, args.max_wait_ms / 1000, args.summary_batch_size
+    )
+    service.warm_up(args.warm)
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"✅ Service d'inférence prêt sur http://{args.host}:{args.port} "
+          f"(lots de {args.max_batch_size}, attente max {args.max_wait_ms:g} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for name, stats in service.health()["batchers"].items():
+            print(f"{name:<18} {stats['batches']:>6} lots {stats['items']:>8} éléments "
+                  f"(moyenne {stats['mean_batch']}/lot)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+from spacy.lang.fr.stop_words import STOP_WORDS
+
+YAKE_PARAMS = {"lan": "fr", "n": 3, "top": 30}
+KEYBERT_NGRAM_RANGE = (2, 8)
+KEYBERT_TOP_N = 5
+# "french" n'est pas une liste intégrée de CountVectorizer : on prend celle de spaCy
+KEYBERT_STOP_WORDS = sorted(STOP_WORDS)
+
+ENCODE_BATCH_SIZE = 256
+WORD_BLOCK_SIZE = 16384
+# en dessous, démarrer un pool de processus coûte plus cher que YAKE en série
+MIN_TEXTS_FOR_POOL = 200
+
+_yake_extractor = None
+
+
+def _init_yake_worker():
+    global _yake_extractor
+    from yake import KeywordExtractor
+    _yake_extractor = KeywordExtractor(**YAKE_PARAMS)
+
+
+def _yake_keywords(txt):
+    return [k[0] for k in _yake_extractor.extract_keywords(txt)]
+
+
+def extract_yake_batch(texts, workers=None):
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(texts) < MIN_TEXTS_FOR_POOL:
+        _init_yake_worker()
+        return [_yake_keywords(txt) for txt in texts]
+
+    chunksize = max(1, len(texts) // (workers * 8))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp.get_context("spawn"),
+        initializer=_init_yake_worker
+    ) as pool:
+        return list(pool.map(_yake_keywords, texts, chunksize=chunksize))
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _merge_top_n(rows, ids, scores, top_n):
+    # garde, pour chaque document, les top_n candidats de plus fort score
+    order = np.lexsort((-scores, rows))
+    rows, ids, scores = rows[order], ids[order], scores[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left")
+    keep = rank < top_n
+    return rows[keep], ids[keep], scores[keep]
+
+
+def extract_keybert_batch(texts, encoder, top_n=KEYBERT_TOP_N,
+                          encode_batch_size=ENCODE_BATCH_SIZE, word_block_size=WORD_BLOCK_SIZE):
+    # même sélection que KeyBERT.extract_keywords (cosinus document / n-grammes candidats du document),
+    # mais le vocabulaire est ajusté une seule fois et chaque candidat n'est encodé qu'une fois
+    vectorizer = CountVectorizer(ngram_range=KEYBERT_NGRAM_RANGE, stop_words=KEYBERT_STOP_WORDS)
+    try:
+        doc_term = vectorizer.fit_transform(texts).tocsc()
+    except ValueError:
+        # aucun n-gramme candidat une fois les stop words retirés (ex: "Super !") : KeyBERT renvoie []
+        return [[] for _ in texts]
+    words = vectorizer.get_feature_names_out()
+
+    doc_embeddings = _normalize(np.asarray(
+        encoder.encode(list(texts), batch_size=encode_batch_size, convert_to_numpy=True), dtype=np.float32
+    ))
+
+    top_rows = np.empty(0, dtype=np.int64)
+    top_ids = np.empty(0, dtype=np.int64)
+    top_scores = np.empty(0, dtype=np.float32)
+
+    # le vocabulaire est traité par blocs pour que la mémoire ne dépende pas de sa taille
+    for start in range(0, len(words), word_block_size):
+        end = min(start + word_block_size, len(words))
+        block = doc_term[:, start:end].tocoo()
+        word_embeddings = _normalize(np.asarray(
+            encoder.encode(list(words[start:end]), batch_size=encode_batch_size, convert_to_numpy=True),
+            dtype=np.float32
+        ))
+        scores = np.einsum("ij,ij->i", doc_embeddings[block.row], word_embeddings[block.col])
+
+        top_rows, top_ids, top_scores = _merge_top_n(
+            np.concatenate([top_rows, block.row.astype(np.int64)]),
+            np.concatenate([top_ids, block.col.astype(np.int64) + start]),
+            np.concatenate([top_scores, scores.astype(np.float32)]),
+            top_n
+        )
+
+    keywords = [[] for _ in texts]
+    for row, word_id in zip(top_rows.tolist(), top_ids.tolist()):
+        keywords[row].append(words[word_id])
+    return keywords
@@ -0,0 +1,160 @@
+import os
+import json
+import threading
+from collections import deque
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.join(BASE_DIR, "..", "config")
+
+SYNONYMS_FILE  = os.path.join(CONFIG_DIR, "synonyms_map.json")
+REPLACE_FILE   = os.path.join(CONFIG_DIR, "replace_map.json")
+BLACKLIST_FILE = os.path.join(CONFIG_DIR, "blacklist.json")
+
+REPLACE, SYNONYM, BLACKLIST = 0, 1, 2
+
+
+class AhoCorasick:
+    def __init__(self, patterns):
+        # patterns : liste de (motif, payload) ; un même motif peut porter plusieurs payloads
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for pattern, payload in patterns:
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                node = nxt
+            self.out[node].append((len(pattern), payload))
+        self._build_fail_links()
+
+    def _build_fail_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[child] = target if target != child else 0
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def finditer(self, text):
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            for length, payload in self.out[node]:
+                yield i + 1 - length, i + 1, payload
+
+
+class Lexicon:
+    def __init__(self, synonyms_map, replace_map, blacklist):
+        self.replace_map = replace_map
+        self.synonyms_map = synonyms_map
+        self.blacklist = set(blacklist)
+        self.canon_labels = list(synonyms_map)
+
+        patterns = [(old, (REPLACE, old)) for old in replace_map]
+        for rank, canon_label in enumerate(self.canon_labels):
+            for syn in synonyms_map[canon_label]:
+                patterns.append((syn, (SYNONYM, rank)))
+        patterns.extend((bad, (BLACKLIST, None)) for bad in self.blacklist)
+        self.automaton = AhoCorasick(patterns)
+
+        # un label canonique est connu d'avance : son statut blacklist est précalculé une fois
+        self._canon_blacklisted = [self._scan(label.lower())[2] for label in self.canon_labels]
+
+    def _scan(self, text):
+        replaces, best_rank, blacklisted = [], None, False
+        for start, end, (kind, value) in self.automaton.finditer(text):
+            if kind == REPLACE:
+                replaces.append((start, end, value))
+            elif kind == SYNONYM:
+                if best_rank is None or value < best_rank:
+                    best_rank = value
+            else:
+                blacklisted = True
+        return replaces, best_rank, blacklisted
+
+    def _apply_replacements(self, text, replaces):
+        # remplacement en une passe : occurrence la plus à gauche, puis la plus longue, sans chevauchement
+        replaces.sort(key=lambda m: (m[0], m[0] - m[1]))
+        parts, pos = [], 0
+        for start, end, old in replaces:
+            if start < pos:
+                continue
+            parts.append(text[pos:start])
+            parts.append(self.replace_map[old])
+            pos = end
+        parts.append(text[pos:])
+        return "".join(parts)
+
+    def apply(self, phrase):
+        # renvoie (tendance après remplacements et synonymes, contient un terme blacklisté ?)
+        lowered = phrase.lower()
+        if lowered == phrase:
+            replaces, best_rank, blacklisted = self._scan(phrase)
+        else:
+            replaces = self._scan(phrase)[0]
+            _, best_rank, blacklisted = self._scan(lowered)
+
+        if replaces:
+            phrase = self._apply_replacements(phrase, replaces)
+            _, best_rank, blacklisted = self._scan(phrase.lower())
+
+        if best_rank is not None:
+            return self.canon_labels[best_rank], self._canon_blacklisted[best_rank]
+        return phrase, blacklisted
+
+    def is_blacklisted(self, phrase):
+        return phrase in self.blacklist
+
+
+def load_config():
+    with open(SYNONYMS_FILE, "r", encoding="utf-8") as f:
+        synonyms_map = json.load(f)
+
+    with open(REPLACE_FILE, "r", encoding="utf-8") as f:
+        replace_map = json.load(f)
+
+    with open(BLACKLIST_FILE, "r", encoding="utf-8") as f:
+        blacklist_data = json.load(f)
+        blacklist = set(blacklist_data)
+
+    return synonyms_map, replace_map, blacklist
+
+
+_lexicon = None
+_lexicon_mtimes = None
+_lexicon_lock = threading.Lock()
+
+
+def _config_mtimes():
+    return tuple(os.stat(path).st_mtime_ns for path in (SYNONYMS_FILE, REPLACE_FILE, BLACKLIST_FILE))
+
+
+def get_lexicon():
+    # compilé une fois, recompilé seulement si un des fichiers JSON a été modifié depuis
+    global _lexicon, _lexicon_mtimes
+    with _lexicon_lock:
+        mtimes = _config_mtimes()
+        if _lexicon is None or mtimes != _lexicon_mtimes:
+            synonyms_map, replace_map, blacklist = load_config()
+            _lexicon = Lexicon(synonyms_map, replace_map, blacklist)
+            _lexicon_mtimes = mtimes
+            print(
+                f"DEBUG: Lexique compilé ({len(replace_map)} remplacements, "
+                f"{sum(len(v) for v in synonyms_map.values())} synonymes, {len(blacklist)} termes blacklistés)"
+            )
+        return _lexicon
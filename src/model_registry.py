@@ -0,0 +1,46 @@
+import time
+import threading
+
+_loaders = {}
+_instances = {}
+_lock = threading.RLock()
+
+load_times = {}
+
+
+def register_model(name, loader):
+    with _lock:
+        _loaders[name] = loader
+
+
+def get_model(name):
+    # RLock : un loader peut lui-même demander un autre modèle (ex: KeyBERT → encodeur)
+    with _lock:
+        if name not in _instances:
+            if name not in _loaders:
+                raise KeyError(f"Modèle non enregistré : {name}")
+            print(f"Chargement du modèle : {name}")
+            start = time.perf_counter()
+            _instances[name] = _loaders[name]()
+            load_times[name] = time.perf_counter() - start
+            print(f"DEBUG: {name} chargé en {load_times[name]:.2f} s")
+        return _instances[name]
+
+
+def is_loaded(name):
+    return name in _instances
+
+
+def unload_model(name):
+    with _lock:
+        _instances.pop(name, None)
+
+
+def report_load_times():
+    if not load_times:
+        print("Aucun modèle chargé.")
+        return
+    print("Temps de chargement des modèles :")
+    for name, seconds in load_times.items():
+        print(f"- {name} : {seconds:.2f} s")
+    print(f"Total : {sum(load_times.values()):.2f} s")
@@ -0,0 +1,227 @@
+import os
+import ast
+import glob
+import json
+import time
+import shlex
+import hashlib
+import argparse
+import datetime
+import importlib
+from graphlib import TopologicalSorter
+
+import src.config  # noqa: F401  (charge .env avant de relever les variables d'environnement)
+from src.model_registry import report_load_times
+from src.review_store import STORE_DIR
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(BASE_DIR, "src")
+CONFIG_DIR = os.path.join(BASE_DIR, "config")
+STATE_FILE = os.path.join(BASE_DIR, "pipeline_state.json")
+# même chemin que sentiment_trend_analysis.TREND_OUTPUT_FILE, sans importer le module et ses dépendances
+TREND_OUTPUT_FILE = os.path.join(SRC_DIR, "trustpilot_sentiment_trends.txt")
+
+# étapes : module lancé (main(argv)), dépendances, variables d'environnement lues,
+# et si elles dépendent du contenu du store d'avis / des fichiers config/*.json
+STAGES = {
+    "scrape_trustpilot": {
+        "module": "src.scrape_trustpilot", "deps": [],
+        "env": ["TRUSTPILOT_BASE_URL"], "store": False, "config": False, "outputs": [],
+    },
+    "scrape_yelp": {
+        "module": "src.scrape", "deps": [],
+        "env": ["BASE_YELP_URL", "YELP_WEB_BASE_URL"], "store": False, "config": False, "outputs": [],
+    },
+    "sentiment": {
+        "module": "src.sentiment_camembert", "deps": ["scrape_trustpilot", "scrape_yelp"],
+        "env": ["CAMEMBERT_ENGINE", "INFERENCE_SERVICE_URL"], "store": True, "config": False, "outputs": [],
+    },
+    "trends": {
+        "module": "src.sentiment_trend_analysis", "deps": ["sentiment"],
+        "env": ["SUMMARY_BACKEND", "LLAMA_CPP_QUANT", "SUMMARY_ASSISTED_DECODING",
+                "VECTOR_INDEX_TYPE", "VECTOR_INDEX_PARAMS", "INFERENCE_SERVICE_URL"],
+        "store": True, "config": True, "outputs": [TREND_OUTPUT_FILE],
+    },
+}
+
+
+def stage_order(selected):
+    graph = {name: stage["deps"] for name, stage in STAGES.items()}
+    return [name for name in TopologicalSorter(graph).static_order() if name in selected]
+
+
+def module_path(module):
+    return os.path.join(BASE_DIR, *module.split(".")) + ".py"
+
+
+def source_files(module):
+    # le module et tous les modules src.* qu'il importe, directement ou non (imports paresseux compris)
+    seen = set()
+    pending = [module]
+    while pending:
+        name = pending.pop()
+        path = module_path(name)
+        if name in seen or not os.path.exists(path):
+            continue
+        seen.add(name)
+        with open(path, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module == "src":
+                # from src import config, inference_client
+                pending.extend(f"src.{alias.name}" for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and node.module.startswith("src."):
+                pending.append(node.module)
+            elif isinstance(node, ast.Import):
+                pending.extend(alias.name for alias in node.names if alias.name.startswith("src."))
+    return sorted(module_path(name) for name in seen)
+
+
+def store_snapshot():
+    # les fichiers du store ne sont jamais modifiés en place : nom, taille et mtime suffisent
+    files = glob.glob(os.path.join(STORE_DIR, "**", "*.parquet"), recursive=True)
+    return sorted(
+        (os.path.relpath(path, STORE_DIR), os.path.getsize(path), os.stat(path).st_mtime_ns) for path in files
+    )
+
+
+def stage_fingerprint(name, argv):
+    stage = STAGES[name]
+    digest = hashlib.sha256()
+
+    def update(label, value):
+        digest.update(f"{label}\x1f{value}\x1e".encode("utf-8"))
+
+    update("argv", json.dumps(argv))
+    for path in source_files(stage["module"]):
+        with open(path, "rb") as f:
+            update(os.path.relpath(path, BASE_DIR), hashlib.sha256(f.read()).hexdigest())
+    for var in stage["env"]:
+        update(var, os.environ.get(var, ""))
+    if stage["config"]:
+        for path in sorted(glob.glob(os.path.join(CONFIG_DIR, "*.json"))):
+            with open(path, "rb") as f:
+                update(os.path.relpath(path, BASE_DIR), hashlib.sha256(f.read()).hexdigest())
+    if stage["store"]:
+        update("store", json.dumps(store_snapshot()))
+    else:
+        # une collecte dépend du site, pas de fichiers locaux : au plus une par jour
+        update("date", datetime.date.today().isoformat())
+    return digest.hexdigest()
+
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return {}
+    with open(STATE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state):
+    tmp_file = STATE_FILE + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_file, STATE_FILE)
+
+
+def stage_runs(name, args):
+    # liste des argv à passer à main() ; vide si l'étape n'a rien à faire
+    if name == "scrape_trustpilot":
+        return [[domain] + shlex.split(args.trustpilot_args) for domain in args.domain or []]
+    if name == "scrape_yelp":
+        return [[args.yelp_location] + shlex.split(args.yelp_args)] if args.yelp_location else []
+    if name == "sentiment":
+        return [shlex.split(args.sentiment_args)]
+    domains = [arg for domain in args.domain or [] for arg in ("--domain", domain)]
+    return [domains + shlex.split(args.trends_args)]
+
+
+def run_stage(name, runs, state, force, dry_run, upstream_pending=False):
+    # renvoie "ignorée", "à jour", "à lancer" (dry-run) ou la durée d'exécution.
+    # upstream_pending : une étape dont elle dépend serait lancée ; en dry-run ses entrées (le store)
+    # n'ont pas encore changé, l'empreinte ne peut donc pas le voir
+    if not runs:
+        return "ignorée"
+    stage = STAGES[name]
+    fingerprint = stage_fingerprint(name, runs)
+    outputs_ready = all(os.path.exists(path) for path in stage["outputs"])
+    up_to_date = outputs_ready and state.get(name, {}).get("fingerprint") == fingerprint
+    if not force and up_to_date and not (dry_run and upstream_pending):
+        return "à jour"
+    if dry_run:
+        return "à lancer"
+
+    module = importlib.import_module(stage["module"])
+    start = time.perf_counter()
+    for argv in runs:
+        print(f"\n=== {name} : python -m {stage['module']} {shlex.join(argv)}")
+        module.main(argv)
+    elapsed = time.perf_counter() - start
+    # empreinte recalculée après coup : l'étape a pu modifier ses propres entrées (ex: sentiments
+    # écrits dans le store), et relancer sur cet état ne changerait rien
+    state[name] = {
+        "fingerprint": stage_fingerprint(name, runs),
+        "finished_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "elapsed": round(elapsed, 2),
+    }
+    save_state(state)
+    return elapsed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Enchaîne collecte, classification et tendances dans un seul processus, "
+                    "en sautant les étapes dont les entrées n'ont pas changé"
+    )
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES),
+                        help="étapes à lancer (par défaut : toutes, dans l'ordre des dépendances)")
+    parser.add_argument("--domain", action="append", default=None,
+                        help="domaine Trustpilot à collecter et à analyser (option répétable)")
+    parser.add_argument("--yelp-location", default=None, help="ville dont collecter les avis Yelp")
+    parser.add_argument("--trustpilot-args", default="", help="options de scrape_trustpilot, ex: \"--max-pages 5\"")
+    parser.add_argument("--yelp-args", default="", help="options de scrape, ex: \"--limit 20\"")
+    parser.add_argument("--sentiment-args", default="", help="options passées à sentiment_camembert")
+    parser.add_argument("--trends-args", default="", help="options passées à sentiment_trend_analysis")
+    parser.add_argument("--force", action="store_true", help="relance les étapes choisies même si elles sont à jour")
+    parser.add_argument("--dry-run", action="store_true", help="affiche les étapes qui seraient lancées")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    state = load_state()
+
+    results = []
+    launched = set()
+    failed = None
+    for name in stage_order(set(args.stages)):
+        upstream_pending = any(dep in launched for dep in STAGES[name]["deps"])
+        try:
+            result = run_stage(name, stage_runs(name, args), state, args.force, args.dry_run, upstream_pending)
+        except SystemExit as e:
+            # argparse d'une étape (ex: --trends-args invalide) : le résumé doit quand même s'afficher
+            print(f"ERREUR: l'étape {name} s'est arrêtée (code {e.code})")
+            failed = name
+            break
+        except Exception as e:
+            print(f"ERREUR: l'étape {name} a échoué : {e}")
+            failed = name
+            break
+        results.append((name, result))
+        if result not in ("ignorée", "à jour"):
+            launched.add(name)
+
+    print(f"\n{'étape':<20} {'résultat':>12}")
+    for name, result in results:
+        shown = f"{result:.2f} s" if isinstance(result, float) else result
+        print(f"{name:<20} {shown:>12}")
+    if failed:
+        print(f"{failed:<20} {'échec':>12}")
+    if not args.dry_run:
+        report_load_times()
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import os
+import uuid
+import argparse
+import datetime
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_DIR = os.path.join(BASE_DIR, "review_store")
+
+SENTIMENTS = ("POSITIVE", "NEGATIVE", "NEUTRAL")
+
+# colonnes écrites dans les fichiers ; domain et scrape_date ne sont portés que par les répertoires
+FILE_SCHEMA = pa.schema([
+    ("source", pa.string()),
+    ("restaurant_id", pa.string()),
+    ("alias", pa.string()),
+    ("name", pa.string()),
+    ("restaurant_rating", pa.float64()),
+    ("review_id", pa.string()),
+    ("review_rating", pa.float64()),
+    ("time_created", pa.string()),
+    ("text", pa.string()),
+    ("sentiment", pa.string()),
+])
+PARTITION_SCHEMA = pa.schema([("domain", pa.string()), ("scrape_date", pa.date32())])
+SCHEMA = pa.schema(list(FILE_SCHEMA) + list(PARTITION_SCHEMA))
+PARTITIONING = ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+
+# dispositions des anciens fichiers TSV, colonne par colonne
+TSV_LAYOUTS = {
+    # scrape_trustpilot.py : domain, domain, nom, note du site, id, note, texte
+    "trustpilot": ["restaurant_id", "alias", "name", "restaurant_rating", "review_id", "review_rating", "text"],
+    # scrape.py : + date de l'avis avant le texte
+    "yelp": ["restaurant_id", "alias", "name", "restaurant_rating", "review_id", "review_rating",
+             "time_created", "text"],
+    # sentiment_camembert.py : avis Trustpilot + sentiment
+    "sentiment": ["restaurant_id", "alias", "name", "restaurant_rating", "review_id", "review_rating",
+                  "text", "sentiment"],
+}
+
+
+def _float_or_none(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_table(records):
+    # records : dicts avec au moins domain et text ; les colonnes absentes restent nulles
+    columns = {}
+    for field in SCHEMA:
+        values = [r.get(field.name) for r in records]
+        if pa.types.is_floating(field.type):
+            values = [_float_or_none(v) for v in values]
+        elif field.name == "scrape_date":
+            values = [datetime.date.fromisoformat(v) if isinstance(v, str) else v for v in values]
+        elif pa.types.is_string(field.type):
+            values = [None if v is None else str(v) for v in values]
+        columns[field.name] = pa.array(values, type=field.type)
+    return pa.table(columns, schema=SCHEMA)
+
+
+def partition_dir(domain, scrape_date, root=STORE_DIR):
+    # les valeurs sont encodées comme le fait pyarrow en lecture (segment_encoding="uri")
+    return os.path.join(root, f"domain={quote(domain, safe='')}", f"scrape_date={scrape_date.isoformat()}")
+
+
+def _write_file(directory, table):
+    # écriture sous un nom caché puis renommage : un fichier visible est toujours complet
+    os.makedirs(directory, exist_ok=True)
+    name = f"part-{uuid.uuid4().hex}.parquet"
+    tmp_path = os.path.join(directory, f".{name}.tmp")
+    pq.write_table(table.select(FILE_SCHEMA.names).cast(FILE_SCHEMA), tmp_path)
+    path = os.path.join(directory, name)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _partitions(table):
+    keys = table.select(["domain", "scrape_date"]).group_by(["domain", "scrape_date"]).aggregate([])
+    return list(zip(keys["domain"].to_pylist(), keys["scrape_date"].to_pylist()))
+
+
+def _partition_filter(domain, scrape_date):
+    return (pc.field("domain") == domain) & (pc.field("scrape_date") == pa.scalar(scrape_date, pa.date32()))
+
+
+def append_reviews(records, scrape_date=None, root=STORE_DIR):
+    # un nouveau fichier par partition touchée ; renvoie le nombre d'avis écrits
+    if not records:
+        return 0
+    scrape_date = scrape_date or datetime.date.today()
+    table = to_table([{**r, "scrape_date": r.get("scrape_date") or scrape_date} for r in records])
+    for domain, date in _partitions(table):
+        _write_file(partition_dir(domain, date, root), table.filter(_partition_filter(domain, date)))
+    return table.num_rows
+
+
+def replace_partition(domain, scrape_date, table, files, root=STORE_DIR):
+    # réécrit une partition en un seul fichier (ex: après ajout des sentiments), puis supprime
+    # `files`, les fichiers lus par read_partition : ceux ajoutés depuis par une collecte restent.
+    # Un arrêt entre l'écriture et les suppressions laisse des avis en double, retirés à la
+    # réécriture suivante (drop_duplicate_reviews)
+    _write_file(partition_dir(domain, scrape_date, root), table)
+    for path in files:
+        os.remove(path)
+
+
+def drop_duplicate_reviews(table):
+    # une ligne par review_id, de préférence une ligne déjà classée ; les avis sans id sont gardés
+    ids = table["review_id"].to_pylist()
+    sentiments = table["sentiment"].to_pylist()
+    best = {}
+    for i, (review_id, sentiment) in enumerate(zip(ids, sentiments)):
+        if review_id is None:
+            continue
+        if review_id not in best or (sentiments[best[review_id]] is None and sentiment is not None):
+            best[review_id] = i
+    keep = [i for i, review_id in enumerate(ids) if review_id is None or best[review_id] == i]
+    return table if len(keep) == table.num_rows else table.take(keep)
+
+
+def open_dataset(root=STORE_DIR):
+    if not os.path.isdir(root):
+        return None
+    return ds.dataset(root, schema=SCHEMA, format="parquet", partitioning=PARTITIONING)
+
+
+def build_filter(sentiments=None, domains=None, since=None, missing_sentiment=False):
+    # prédicats évalués par pyarrow : domain/scrape_date élaguent des répertoires entiers,
+    # sentiment est comparé aux statistiques des row groups avant toute lecture de colonne
+    expr = None
+    conditions = []
+    if sentiments:
+        conditions.append(pc.field("sentiment").isin(list(sentiments)))
+    if missing_sentiment:
+        conditions.append(pc.field("sentiment").is_null())
+    if domains:
+        conditions.append(pc.field("domain").isin(list(domains)))
+    if since:
+        conditions.append(pc.field("scrape_date") >= pa.scalar(since, pa.date32()))
+    for condition in conditions:
+        expr = condition if expr is None else expr & condition
+    return expr
+
+
+def read_table(columns=None, sentiments=None, domains=None, since=None, missing_sentiment=False, root=STORE_DIR):
+    dataset = open_dataset(root)
+    columns = list(columns) if columns else SCHEMA.names
+    if dataset is None:
+        return SCHEMA.empty_table().select(columns)
+    return dataset.to_table(
+        columns=columns, filter=build_filter(sentiments, domains, since, missing_sentiment)
+    )
+
+
+def read_reviews(columns=None, sentiments=None, domains=None, since=None, root=STORE_DIR):
+    # colonnes pandas adossées aux buffers Arrow (ArrowDtype) : pas de copie ni d'objets str Python
+    table = read_table(columns, sentiments, domains, since, root=root)
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def pending_partitions(root=STORE_DIR):
+    # partitions contenant au moins un avis sans sentiment
+    table = read_table(["domain", "scrape_date"], missing_sentiment=True, root=root)
+    return sorted(_partitions(table))
+
+
+def read_partition(domain, scrape_date, root=STORE_DIR):
+    # renvoie (avis de la partition, fichiers lus), à passer tels quels à replace_partition
+    dataset = open_dataset(root)
+    if dataset is None:
+        return SCHEMA.empty_table(), []
+    files = [fragment.path for fragment in dataset.get_fragments(filter=_partition_filter(domain, scrape_date))]
+    if not files:
+        return SCHEMA.empty_table(), []
+    partition = ds.dataset(
+        files, schema=SCHEMA, format="parquet", partitioning=PARTITIONING, partition_base_dir=root
+    )
+    return partition.to_table(), files
+
+
+def import_tsv(path, layout, source, domain=None, scrape_date=None, root=STORE_DIR):
+    # un avis par ligne, colonnes séparées par une tabulation ; le texte n'est jamais redécoupé
+    columns = TSV_LAYOUTS[layout]
+    records = []
+    skipped = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\r\n").split("\t")
+            if len(parts) != len(columns):
+                skipped += 1
+                continue
+            record = dict(zip(columns, parts))
+            if not record["text"].strip():
+                skipped += 1
+                continue
+            record["source"] = source
+            record["domain"] = domain or record["alias"]
+            if record.get("sentiment") not in SENTIMENTS:
+                record["sentiment"] = None
+            records.append(record)
+    return append_reviews(records, scrape_date, root), skipped
+
+
+def export_tsv(path, layout, sentiments=None, domains=None, root=STORE_DIR):
+    columns = TSV_LAYOUTS[layout]
+    table = read_table(columns, sentiments=sentiments, domains=domains, root=root)
+    with open(path, "w", encoding="utf-8") as f:
+        for row in table.to_pylist():
+            values = ["" if v is None else str(v) for v in (row[c] for c in columns)]
+            f.write("\t".join(v.replace("\t", " ").replace("\n", " ") for v in values) + "\n")
+    return table.num_rows
+
+
+def print_stats(root=STORE_DIR):
+    table = read_table(["domain", "scrape_date", "sentiment"], root=root)
+    if table.num_rows == 0:
+        print(f"Aucun avis dans {root}")
+        return
+    counts = table.group_by(["domain", "scrape_date", "sentiment"]).aggregate([([], "count_all")])
+    print(f"{'domaine':<30} {'date':<10} {'sentiment':<10} {'avis':>6}")
+    for row in sorted(counts.to_pylist(), key=lambda r: (r["domain"], r["scrape_date"], r["sentiment"] or "")):
+        print(f"{row['domain'][:30]:<30} {row['scrape_date'].isoformat():<10} "
+              f"{row['sentiment'] or '-':<10} {row['count_all']:>6}")
+    print(f"{table.num_rows} avis, {len(_partitions(table))} partitions")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Store Parquet des avis, partitionné par domaine et date de collecte")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="avis par domaine, date et sentiment")
+
+    importer = commands.add_parser("import", help="ajoute les avis d'un fichier TSV au store")
+    importer.add_argument("path")
+    importer.add_argument("--layout", choices=list(TSV_LAYOUTS), default="trustpilot")
+    importer.add_argument("--source", choices=["trustpilot", "yelp"], default="trustpilot")
+    importer.add_argument("--domain", default=None, help="par défaut : la colonne alias")
+    importer.add_argument("--scrape-date", type=datetime.date.fromisoformat, default=None,
+                          help="AAAA-MM-JJ, par défaut aujourd'hui")
+
+    exporter = commands.add_parser("export", help="écrit les avis du store dans un fichier TSV")
+    exporter.add_argument("path")
+    exporter.add_argument("--layout", choices=list(TSV_LAYOUTS), default="sentiment")
+    exporter.add_argument("--sentiment", action="append", choices=SENTIMENTS, default=None)
+    exporter.add_argument("--domain", action="append", default=None)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == "stats":
+        print_stats()
+    elif args.command == "import":
+        written, skipped = import_tsv(args.path, args.layout, args.source, args.domain, args.scrape_date)
+        print(f"✅ {written} avis importés dans {STORE_DIR} ({skipped} lignes ignorées)")
+    else:
+        written = export_tsv(args.path, args.layout, args.sentiment, args.domain)
+        print(f"✅ {written} avis exportés dans {args.path}")
+
+
+if __name__ == "__main__":
+    main()
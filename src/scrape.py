@@ -1,95 +1,133 @@
-import sys
 import uuid
 import time
+import argparse
 from decimal import Decimal
-import os
-import requests
-from selenium import webdriver
+from concurrent.futures import ThreadPoolExecutor
+
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 
+from src.config import YELP_WEB_BASE_URL
 from src.yelp_api import get_restaurants_by_location
+from src.webdriver_pool import WebDriverPool
+from src.review_store import append_reviews, STORE_DIR
+
+REVIEW_XPATH = '//p[contains(@class,"comment__09f24__D0cxf")]'
+DEFAULT_BROWSERS = 3
+REVIEW_WAIT_TIMEOUT = 10
 
-def scrape_reviews_selenium(alias, max_reviews=50):
+
+def scrape_reviews_selenium(alias, driver, max_reviews=50, base_url=YELP_WEB_BASE_URL):
     data = []
     if not alias:
         return data
-    url = f"https://www.yelp.com/biz/{alias}"
-    driver = webdriver.Chrome()
+    url = f"{base_url.rstrip('/')}/biz/{alias}"
+    driver.get(url)
     try:
-        driver.get(url)
-        time.sleep(3)
-        elements = driver.find_elements(By.XPATH, '//p[contains(@class,"comment__09f24__D0cxf")]')
-        for e in elements[:max_reviews]:
-            try:
-                review_text = e.text
-            except:
-                review_text = ""
-            try:
-                rating_el = e.find_element(
-                    By.XPATH,
-                    './/div[@role="img" and contains(@aria-label,"star rating")]'
-                )
-                rating_str = rating_el.get_attribute("aria-label")
-                rating_value = rating_str.split(" ")[0]
-            except:
-                rating_value = "0"
-            try:
-                date_el = e.find_element(By.XPATH, './/span[contains(@class,"css-1e4fdj9")]')
-                time_created = date_el.text
-            except:
-                time_created = ""
-            try:
-                rating_decimal = Decimal(rating_value)
-            except:
-                rating_decimal = Decimal("0")
-            data.append({
-                "text": review_text,
-                "rating": rating_decimal,
-                "time_created": time_created
-            })
-    finally:
-        driver.quit()
+        # attente explicite des avis plutôt qu'une pause fixe
+        elements = WebDriverWait(driver, REVIEW_WAIT_TIMEOUT).until(
+            EC.presence_of_all_elements_located((By.XPATH, REVIEW_XPATH))
+        )
+    except TimeoutException:
+        print(f"[WARNING] Aucun avis chargé en {REVIEW_WAIT_TIMEOUT} s pour {alias}.")
+        return data
+    for e in elements[:max_reviews]:
+        try:
+            review_text = e.text
+        except:
+            review_text = ""
+        try:
+            rating_el = e.find_element(
+                By.XPATH,
+                './/div[@role="img" and contains(@aria-label,"star rating")]'
+            )
+            rating_str = rating_el.get_attribute("aria-label")
+            rating_value = rating_str.split(" ")[0]
+        except:
+            rating_value = "0"
+        try:
+            date_el = e.find_element(By.XPATH, './/span[contains(@class,"css-1e4fdj9")]')
+            time_created = date_el.text
+        except:
+            time_created = ""
+        try:
+            rating_decimal = Decimal(rating_value)
+        except:
+            rating_decimal = Decimal("0")
+        data.append({
+            "text": review_text,
+            "rating": rating_decimal,
+            "time_created": time_created
+        })
     return data
 
-def main():
-    if len(sys.argv) > 1:
-        location = sys.argv[1]
-    else:
-        location = "Paris"
-
-    restaurants = get_restaurants_by_location(location=location, limit=10)
+def scrape_business(pool, alias, max_reviews, base_url):
+    # renvoie (avis, latence en secondes) ; un navigateur du pool est emprunté le temps d'une page
+    start = time.perf_counter()
+    try:
+        # l'erreur traverse pool.driver() : un navigateur dont la session est perdue y est remplacé
+        with pool.driver() as driver:
+            reviews = scrape_reviews_selenium(alias, driver, max_reviews, base_url)
+    except Exception as e:
+        print(f"Erreur pour {alias} : {e}")
+        reviews = []
+    return reviews, time.perf_counter() - start
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Avis Yelp des restaurants d'une ville, via l'API et Selenium")
+    parser.add_argument("location", nargs="?", default="Paris")
+    parser.add_argument("--limit", type=int, default=10, help="nombre de restaurants")
+    parser.add_argument("--max-reviews", type=int, default=5, help="avis gardés par restaurant")
+    parser.add_argument("--browsers", type=int, default=DEFAULT_BROWSERS, help="navigateurs en parallèle")
+    parser.add_argument("--base-url", default=YELP_WEB_BASE_URL,
+                        help="racine des pages Yelp (ex: un serveur local de pages de test)")
+    return parser.parse_args(argv)
 
-    with open("reviews_output.txt", "a", encoding="utf-8") as f:
-        for r in restaurants:
-            rest_id = r.get("id", "")
-            alias = r.get("alias", "")
-            name = r.get("name", "")
-            rating_float = r.get("rating", 0)
-            rating_dec = Decimal(str(rating_float))
+def main(argv=None):
+    args = parse_args(argv)
 
-            if not alias:
-                continue
+    restaurants = [r for r in get_restaurants_by_location(location=args.location, limit=args.limit) if r.get("alias")]
+    if not restaurants:
+        print("Aucun restaurant trouvé.")
+        return
 
-            reviews = scrape_reviews_selenium(alias, 5)
-            for rev in reviews:
+    start = time.perf_counter()
+    with WebDriverPool(min(args.browsers, len(restaurants))) as pool:
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            results = list(executor.map(
+                lambda r: scrape_business(pool, r["alias"], args.max_reviews, args.base_url), restaurants
+            ))
+        utilization = pool.utilization()
+    elapsed = time.perf_counter() - start
 
-                review_id = str(uuid.uuid4())
-                text = rev.get("text", "").replace("\n", " ")
-                review_rating = rev.get("rating", Decimal("0"))
-                time_created = rev.get("time_created", "")
+    records = []
+    for r, (reviews, _) in zip(restaurants, results):
+        for rev in reviews:
+            records.append({
+                "source": "yelp",
+                "domain": r["alias"],
+                "restaurant_id": r.get("id", ""),
+                "alias": r["alias"],
+                "name": r.get("name", ""),
+                "restaurant_rating": r.get("rating", 0),
+                "review_id": str(uuid.uuid4()),
+                "review_rating": rev.get("rating", Decimal("0")),
+                "time_created": rev.get("time_created", ""),
+                "text": rev.get("text", "").replace("\n", " "),
+            })
+    append_reviews(records)
 
-                line = (
-                    f"{rest_id}\t"
-                    f"{alias}\t"
-                    f"{name}\t"
-                    f"{rating_dec}\t"
-                    f"{review_id}\t"
-                    f"{review_rating}\t"
-                    f"{time_created}\t"
-                    f"{text}\n"
-                )
-                f.write(line)
+    print(f"{'restaurant':<40} {'avis':>5} {'latence (s)':>12}")
+    for r, (reviews, latency) in zip(restaurants, results):
+        print(f"{r['alias'][:40]:<40} {len(reviews):>5} {latency:>12.2f}")
+    latencies = sorted(latency for _, latency in results)
+    print(
+        f"{len(restaurants)} restaurants en {elapsed:.2f} s avec {pool.size} navigateurs, "
+        f"latence médiane {latencies[len(latencies) // 2]:.2f} s, utilisation du pool {utilization * 100:.0f}%"
+    )
+    print(f"{len(records)} avis enregistrés dans `{STORE_DIR}`.")
 
 if __name__ == "__main__":
     main()
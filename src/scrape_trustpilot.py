@@ -1,57 +1,212 @@
-import os
-import sys
 import time
 import random
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+import asyncio
+import argparse
 
-if len(sys.argv) < 2:
-    print("Usage: python scrape_trustpilot.py <site>")
-    sys.exit(1)
+from src.config import TRUSTPILOT_BASE_URL
+from src.crawl_state import CrawlState
+from src.review_store import append_reviews, STORE_DIR
+from src.trustpilot_crawler import (
+    crawl_domain, crawl_frontier, review_page_url, text_review_id, DEFAULT_CONCURRENCY, DEFAULT_RATE
+)
 
-DOMAIN = sys.argv[1]
-SITE_NAME = DOMAIN.replace(".fr", "").replace(".com", "").replace(".net", "").replace(".org", "").capitalize()
-OUTPUT_FILE = "trustpilot_reviews.txt"
+def site_name(domain):
+    return domain.replace(".fr", "").replace(".com", "").replace(".net", "").replace(".org", "").capitalize()
 
-chrome_options = Options()
-chrome_options.add_argument("--headless") 
-chrome_options.add_argument("--disable-gpu")
-chrome_options.add_argument("--no-sandbox")
 
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=chrome_options)
+def filter_new_reviews(reviews, known):
+    # ne garde que les avis jamais vus ; `known` est mis à jour au fil de l'eau
+    # (un avis peut glisser d'une page à la suivante pendant la collecte)
+    new_reviews = []
+    for review in reviews:
+        if review["review_id"] in known:
+            continue
+        known.add(review["review_id"])
+        new_reviews.append(review)
+    return new_reviews
 
-page = 1
-total_reviews = 0
 
-while True:
-    url = f"https://fr.trustpilot.com/review/{DOMAIN}?page={page}"
-    print(f"Chargement de la page {page} → {url}")
-    driver.get(url)
-    time.sleep(random.uniform(3, 6))
+def review_records(domain, name, trust_score, reviews):
+    return [{
+        "source": "trustpilot",
+        "domain": domain,
+        "restaurant_id": domain,
+        "alias": domain,
+        "name": name,
+        "restaurant_rating": trust_score,
+        "review_id": review["review_id"],
+        "review_rating": review["rating"] if review["rating"] is not None else 5,
+        "time_created": review.get("published"),
+        "text": review["text"],
+    } for review in reviews]
 
-    reviews = driver.find_elements(By.CLASS_NAME, "styles_reviewContent__44s_M")
 
-    if not reviews:
-        print(f"✅ Fin de l'extraction : Aucune donnée trouvée à la page {page}.")
-        break 
+def scrape_with_selenium(domain, base_url, state, incremental):
+    # ancien chemin : rendu de chaque page dans Chrome, gardé en repli si le JSON embarqué disparaît
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from webdriver_manager.chrome import ChromeDriverManager
 
-    with open(OUTPUT_FILE, "a", encoding="utf-8") as f:
-        for i, review in enumerate(reviews, start=1):
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+
+    service = Service(ChromeDriverManager().install())
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+
+    name = site_name(domain)
+    known = state.known_ids(domain)
+    page = 1
+    total_reviews = 0
+
+    while True:
+        url = review_page_url(base_url, domain, page)
+        print(f"Chargement de la page {page} → {url}")
+        driver.get(url)
+        time.sleep(random.uniform(3, 6))
+
+        elements = driver.find_elements(By.CLASS_NAME, "styles_reviewContent__44s_M")
+
+        if not elements:
+            print(f"✅ Fin de l'extraction : Aucune donnée trouvée à la page {page}.")
+            break
+
+        reviews = []
+        for i, element in enumerate(elements, start=1):
             try:
-                text = review.find_element(By.CLASS_NAME, "typography_body-l__v5JLj").text.strip()
-                text = " ".join(text.splitlines())  
-                f.write(f"{DOMAIN}\t{DOMAIN}\t{SITE_NAME}\t4.0\tREVIEW_{page}_{i}\t5\t{text}\n")
-                total_reviews += 1
+                text = element.find_element(By.CLASS_NAME, "typography_body-l__v5JLj").text.strip()
+                text = " ".join(text.splitlines())
+                reviews.append({"review_id": text_review_id(text), "rating": None, "text": text})
             except Exception as e:
                 print(f"Erreur pour l'avis {i} sur la page {page}: {e}")
 
-    print(f"✅ {len(reviews)} avis ajoutés depuis la page {page}.")
-    
-    page += 1 
+        if incremental and reviews and all(r["review_id"] in known for r in reviews):
+            print(f"✅ Page {page} déjà collectée, arrêt de la collecte incrémentale.")
+            break
+
+        new_reviews = filter_new_reviews(reviews, known)
+        append_reviews(review_records(domain, name, 4.0, new_reviews))
+        state.add_reviews(domain, new_reviews)
+        total_reviews += len(new_reviews)
+        print(f"✅ {len(new_reviews)} nouveaux avis ajoutés depuis la page {page}.")
+
+        page += 1
+
+    driver.quit()
+    if not incremental:
+        # parcours jusqu'à la première page vide : tout l'historique a été lu
+        state.set_backfill(domain, page, True)
+    return total_reviews, page - 1
+
+
+def scrape_with_http(domain, base_url, concurrency, rate, max_pages, state, incremental):
+    # None si la première page a été servie sans __NEXT_DATA__ (repli Selenium) ;
+    # PageUnavailable si elle n'a pas pu être lue du tout
+    known = state.known_ids(domain)
+    # les avis sont triés du plus récent au plus ancien : une page entièrement connue
+    # signifie que les avis suivants ont déjà été vus, jusqu'où l'historique a été lu
+    stop_at = (lambda reviews: all(r["review_id"] in known for r in reviews)) if incremental else None
+    result = asyncio.run(crawl_domain(
+        domain, base_url, concurrency=concurrency, rate=rate, max_pages=max_pages, stop_at=stop_at
+    ))
+    if result is None:
+        return None
+    business, pages, failed, reason = result
+
+    next_page, complete = state.backfill(domain)
+    if not incremental or reason != "stop":
+        # collecte depuis la page 1 qui n'a pas rejoint les avis connus : elle fixe seule l'avancement
+        next_page, complete = crawl_frontier(1, pages, failed, reason)
+    elif failed:
+        # des avis récents sont restés sur les pages en échec, qui sont relues en reprise
+        next_page, complete = min(next_page, min(failed)), False
+
+    if incremental and reason == "stop" and not complete:
+        # une collecte précédente s'est arrêtée avant la fin (--max-pages, pages en échec) :
+        # une fois les nouveaux avis lus, l'historique est repris là où elle s'est arrêtée
+        print(f"Reprise de l'historique à partir de la page {next_page}")
+        backfill = asyncio.run(crawl_domain(
+            domain, base_url, concurrency=concurrency, rate=rate, max_pages=max_pages, start_page=next_page
+        ))
+        if backfill is None:
+            print(f"ERREUR: Page {next_page} sans __NEXT_DATA__, reprise reportée.")
+        else:
+            _, more_pages, more_failed, more_reason = backfill
+            pages = pages + more_pages
+            failed = failed + more_failed
+            next_page, complete = crawl_frontier(next_page, more_pages, more_failed, more_reason)
+    state.set_backfill(domain, next_page, complete)
+
+    name = business["name"] or site_name(domain)
+    trust_score = business["trust_score"] if business["trust_score"] is not None else 4.0
+    # un seul fichier Parquet par collecte plutôt qu'un par page
+    new_reviews = []
+    for page, reviews in pages:
+        new_reviews.extend(filter_new_reviews(reviews, known))
+    append_reviews(review_records(domain, name, trust_score, new_reviews))
+    state.add_reviews(domain, new_reviews)
+    total_reviews = len(new_reviews)
+    if pages:
+        print(f"✅ {len(pages)} pages lues, dernière page : {pages[-1][0]}.")
+    else:
+        print("✅ Aucun nouvel avis depuis la dernière collecte.")
+    if failed:
+        print(f"ERREUR: {len(failed)} pages illisibles, ignorées : {', '.join(map(str, failed))}")
+    if not complete:
+        print(f"Historique incomplet : la prochaine collecte reprendra à la page {next_page}.")
+    return total_reviews, len(pages)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Récupère les avis Trustpilot d'un domaine")
+    parser.add_argument("domain", help="ex: cofidis.fr")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="pages téléchargées en parallèle")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help="débit moyen maximal, en pages par seconde")
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--base-url", default=TRUSTPILOT_BASE_URL,
+                        help="racine du site (ex: un serveur local de pages de test)")
+    parser.add_argument("--selenium", action="store_true",
+                        help="force l'ancien parcours page par page dans Chrome")
+    parser.add_argument("--full", action="store_true",
+                        help="parcourt toutes les pages au lieu de s'arrêter à la première page déjà collectée")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start_time = time.time()
+
+    state = CrawlState()
+    incremental = not args.full and state.has_crawled(args.domain)
+    mode = "incrémentale" if incremental else "complète"
+    print(f"Collecte {mode} de {args.domain}")
+
+    try:
+        result = None
+        if not args.selenium:
+            # une première page injoignable ou inconnue (PageUnavailable) n'a rien à voir avec le
+            # format des pages : l'erreur remonte, sans repli
+            result = scrape_with_http(
+                args.domain, args.base_url, args.concurrency, args.rate, args.max_pages, state, incremental
+            )
+            if result is None:
+                print("ERREUR: Pas de __NEXT_DATA__ dans la page, repli sur Selenium.")
+        if result is None:
+            result = scrape_with_selenium(args.domain, args.base_url, state, incremental)
+
+        total_reviews, pages = result
+        state.record_crawl(args.domain, start_time, "incremental" if incremental else "full", pages, total_reviews)
+    finally:
+        state.close()
+
+    print(f"Extraction terminée : {total_reviews} nouveaux avis enregistrés dans `{STORE_DIR}`.")
+    print(f"Temps d'exécution: {time.time() - start_time:.2f} secondes.")
+
 
-print(f"Extraction terminée : {total_reviews} avis enregistrés dans `{OUTPUT_FILE}`.")
-driver.quit()
+if __name__ == "__main__":
+    main()
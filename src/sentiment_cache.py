@@ -0,0 +1,134 @@
+import os
+import re
+import sys
+import json
+import sqlite3
+import hashlib
+import unicodedata
+
+from src.camembert_inference import MODEL_NAME, LABEL_MAPPING, DEFAULT_ENGINE, ENGINES
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_FILE = os.path.join(BASE_DIR, "sentiment_cache.sqlite")
+
+
+def model_fingerprint(model_name=MODEL_NAME, label_mapping=LABEL_MAPPING, engine=DEFAULT_ENGINE):
+    payload = json.dumps({"model": model_name, "labels": label_mapping, "engine": engine}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def current_fingerprints():
+    # modèle et mapping courants, pour chacun des moteurs d'inférence
+    return [model_fingerprint(engine=engine) for engine in ENGINES]
+
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class SentimentCache:
+    def __init__(self, path=CACHE_FILE, fingerprint=None):
+        self.path = path
+        self.fingerprint = fingerprint or model_fingerprint()
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sentiments ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, sentiment TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    def make_key(self, text):
+        payload = f"{self.fingerprint}\x00{normalize_text(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        # SQLite limite le nombre de paramètres par requête
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            rows = self.conn.execute(
+                f"SELECT key, sentiment FROM sentiments WHERE key IN ({placeholders})", part
+            )
+            found.update(rows)
+        return found
+
+    def put_many(self, items):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO sentiments (key, model, sentiment) VALUES (?, ?, ?)",
+            [(key, self.fingerprint, sentiment) for key, sentiment in items]
+        )
+        self.conn.commit()
+
+    def invalidate(self, all_models=False, keep=None):
+        # keep : empreintes à conserver (par défaut celle du cache)
+        if all_models:
+            cur = self.conn.execute("DELETE FROM sentiments")
+        else:
+            keep = list(keep or [self.fingerprint])
+            cur = self.conn.execute(
+                f"DELETE FROM sentiments WHERE model NOT IN ({', '.join('?' * len(keep))})", keep
+            )
+        self.conn.commit()
+        return cur.rowcount
+
+    def count(self):
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM sentiments WHERE model = ?", (self.fingerprint,)
+        ).fetchone()[0]
+
+    def stats_line(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"Cache sentiment : {self.hits} hits, {self.misses} misses ({rate:.2f}% servis depuis le cache)"
+
+    def close(self):
+        self.conn.close()
+
+
+def classify_with_cache(texts, cache, classify, **kwargs):
+    keys = [cache.make_key(t) for t in texts]
+    found = cache.get_many(set(keys))
+
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in found and key not in missing:
+            missing[key] = text
+
+    nb_hits = sum(1 for key in keys if key in found)
+    cache.hits += nb_hits
+    cache.misses += len(keys) - nb_hits
+
+    if missing:
+        new_sentiments = classify(list(missing.values()), **kwargs)
+        new_items = list(zip(missing.keys(), new_sentiments))
+        cache.put_many(new_items)
+        found.update(new_items)
+
+    return [found[key] for key in keys]
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("stats", "invalidate", "clear"):
+        print("Usage: python -m src.sentiment_cache <stats|invalidate|clear>")
+        print("  invalidate : supprime les entrées d'un autre modèle / mapping de labels (tous moteurs confondus)")
+        print("  clear      : vide entièrement le cache")
+        sys.exit(1)
+
+    cache = SentimentCache()
+    action = sys.argv[1]
+    if action == "stats":
+        total = cache.conn.execute("SELECT COUNT(*) FROM sentiments").fetchone()[0]
+        print(f"{cache.count()} entrées pour le modèle courant ({cache.fingerprint}), {total} au total dans {cache.path}")
+    else:
+        removed = cache.invalidate(all_models=(action == "clear"), keep=current_fingerprints())
+        print(f"✅ {removed} entrées supprimées de {cache.path}")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
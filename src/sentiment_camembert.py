@@ -1,92 +1,256 @@
 import os
-import re
-from transformers import pipeline
+import json
+import argparse
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  
+import pyarrow as pa
+
+from src.camembert_inference import classify_texts, DEFAULT_BATCH_SIZE, DEFAULT_ENGINE, ENGINES
+from src.sentiment_cache import SentimentCache, classify_with_cache, model_fingerprint
+from src.camembert_parallel import start_worker_pool, classify_texts_parallel, default_threads_per_worker
+from src import inference_client
+from src.review_store import (
+    pending_partitions, read_partition, replace_partition, drop_duplicate_reviews, STORE_DIR
+)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 #INPUT_FILE = os.path.join(BASE_DIR, "reviews_output.txt")
 INPUT_FILE = os.path.join(BASE_DIR, "trustpilot_reviews.txt")
-#OUTPUT_FILE = os.path.join(BASE_DIR, "reviews_with_sentiment_camembert.txt") 
-OUTPUT_FILE = os.path.join(BASE_DIR, "trustpilot_reviews_with_sentiment_camembert.txt")  
+#OUTPUT_FILE = os.path.join(BASE_DIR, "reviews_with_sentiment_camembert.txt")
+OUTPUT_FILE = os.path.join(BASE_DIR, "trustpilot_reviews_with_sentiment_camembert.txt")
+CHECKPOINT_FILE = OUTPUT_FILE + ".checkpoint.json"
 
-print(f"DEBUG: Chemin d'entrée → {INPUT_FILE}")
-print(f"DEBUG: Chemin de sortie → {OUTPUT_FILE}")
-
-sentiment_pipeline = pipeline("sentiment-analysis", model="cmarkea/distilcamembert-base-sentiment")
+DEFAULT_CHUNK_SIZE = 512
 
 def compute_sentiment_camembert(text):
-    result = sentiment_pipeline(text[:512])[0]
-    label = result["label"]
+    return classify_texts([text])[0]
 
-    if "5" in label or "4" in label:
-        return "POSITIVE"
-    elif "2" in label or "1" in label:
-        return "NEGATIVE"
-    else:
-        return "NEUTRAL"
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Classification des avis avec DistilCamemBERT")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="nombre d'avis par passe du modèle")
+    parser.add_argument("--engine", choices=ENGINES, default=DEFAULT_ENGINE,
+                        help="moteur d'inférence : PyTorch fp32 ou ONNX Runtime quantifié int8")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="nombre d'avis gardés en mémoire avant écriture et checkpoint")
+    parser.add_argument("--tsv", action="store_true",
+                        help="lit et écrit les fichiers TSV au lieu du store Parquet")
+    parser.add_argument("--restart", action="store_true",
+                        help="(--tsv) ignore le checkpoint et reprend depuis le début du fichier")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="reclassifie tous les avis sans passer par le cache SQLite")
+    parser.add_argument("--invalidate-cache", action="store_true",
+                        help="vide le cache avant de lancer la classification (ex: changement de modèle)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="nombre de processus qui chargent chacun le modèle (1 = dans le processus courant)")
+    parser.add_argument("--threads-per-worker", type=int, default=None,
+                        help="threads torch par worker (par défaut : cœurs disponibles / workers)")
+    return parser.parse_args(argv)
+
+def parse_line(line):
+    # seule la tabulation sépare les colonnes : les espaces du texte de l'avis sont conservés
+    line = line.rstrip("\r\n")
+    if not line.strip():
+        return None
+
+    p = line.split("\t")
+
+    if len(p) != 7:
+        print(f" ERREUR: Ligne mal formatée (cols={len(p)}) → {p}")
+        return None
+
+    rid, alias, name, rest_rating, review_id, review_rating, text = p
+
+    print(f"DEBUG: Avis extrait → {text}")
+
+    return {
+        "restaurant_id": rid,
+        "alias": alias,
+        "name": name,
+        "restaurant_rating": rest_rating,
+        "review_id": review_id,
+        "review_rating": review_rating,
+        "text": text
+    }
+
+def format_line(it):
+    return (
+        f"{it['restaurant_id']}\t"
+        f"{it['alias']}\t"
+        f"{it['name']}\t"
+        f"{it['restaurant_rating']}\t"
+        f"{it['review_id']}\t"
+        f"{it['review_rating']}\t"
+        f"{it['text']}\t"
+        f"{it['sentiment']}\n"
+    )
+
+def read_review_chunks(path, start_offset, chunk_size):
+    # lecture en binaire pour que l'offset renvoyé soit un offset d'octets fiable
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        chunk = []
+        while True:
+            raw = f.readline()
+            if not raw:
+                break
+            item = parse_line(raw.decode("utf-8"))
+            if item is not None:
+                chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield chunk, f.tell()
+                chunk = []
+        if chunk:
+            yield chunk, f.tell()
+
+def load_checkpoint():
+    if not os.path.exists(CHECKPOINT_FILE):
+        return None
+    with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("input_offset", 0) > os.path.getsize(INPUT_FILE):
+        print("DEBUG: Checkpoint incohérent avec le fichier d'entrée, reprise depuis le début.")
+        return None
+    if not os.path.exists(OUTPUT_FILE) or os.path.getsize(OUTPUT_FILE) < checkpoint.get("output_size", 0):
+        print("DEBUG: Fichier de sortie incomplet, reprise depuis le début.")
+        return None
+    return checkpoint
 
-def main():
+def save_checkpoint(checkpoint):
+    tmp_file = CHECKPOINT_FILE + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_file, CHECKPOINT_FILE)
+
+def classify_store(classify_batch):
+    # chaque partition (domaine, date de collecte) est réécrite une fois classée :
+    # une interruption ne fait perdre que la partition en cours
+    processed = 0
+    for domain, scrape_date in pending_partitions():
+        table, files = read_partition(domain, scrape_date)
+        rows = table.num_rows
+        # doublons laissés par une réécriture interrompue : les lignes déjà classées sont gardées
+        table = drop_duplicate_reviews(table)
+        if table.num_rows < rows:
+            print(f"DEBUG: {domain} ({scrape_date}) → {rows - table.num_rows} avis en double retirés")
+        sentiments = table["sentiment"].to_pylist()
+        todo = [i for i, s in enumerate(sentiments) if s is None]
+        texts = table["text"].to_pylist()
+        for i, sentiment in zip(todo, classify_batch([texts[i] for i in todo])):
+            sentiments[i] = sentiment
+        table = table.set_column(
+            table.schema.get_field_index("sentiment"), "sentiment", pa.array(sentiments, pa.string())
+        )
+        replace_partition(domain, scrape_date, table, files)
+        processed += len(todo)
+        print(f"DEBUG: {domain} ({scrape_date}) → {len(todo)} avis classés")
+    return processed
+
+def classify_tsv(classify_batch, args):
     if not os.path.exists(INPUT_FILE):
         print(f"ERREUR: Le fichier {INPUT_FILE} n'existe pas.")
-        return
+        return None
 
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        lines = f.readlines()
+    if os.path.getsize(INPUT_FILE) == 0:
+        print(f"ERREUR: `{INPUT_FILE}` est vide.")
+        return None
 
-    print(f"DEBUG: {len(lines)} lignes lues dans {INPUT_FILE}")  
+    print(f"DEBUG: Chemin d'entrée → {INPUT_FILE}")
+    print(f"DEBUG: Chemin de sortie → {OUTPUT_FILE}")
 
-    if len(lines) == 0:
-        print("ERREUR: `reviews_output.txt` est vide.")
-        return
+    checkpoint = None if args.restart else load_checkpoint()
+    if checkpoint is None:
+        checkpoint = {"input_offset": 0, "output_size": 0, "processed": 0, "last_review_id": None}
+    else:
+        print(
+            f"DEBUG: Reprise au checkpoint → octet {checkpoint['input_offset']}, "
+            f"{checkpoint['processed']} avis déjà traités (dernier : {checkpoint['last_review_id']})"
+        )
+
+    processed_this_run = 0
+    with open(OUTPUT_FILE, "ab") as f_out:
+        # on retire ce qui a pu être écrit après le dernier checkpoint (crash en cours d'écriture)
+        f_out.truncate(checkpoint["output_size"])
+        f_out.seek(checkpoint["output_size"])
+
+        for items, next_offset in read_review_chunks(INPUT_FILE, checkpoint["input_offset"], args.chunk_size):
+            sentiments = classify_batch([it["text"] for it in items])
+            for it, sentiment in zip(items, sentiments):
+                it["sentiment"] = sentiment
+                print(f"DEBUG: Avis → {it['text']} | Sentiment détecté → {it['sentiment']}")
+                f_out.write(format_line(it).encode("utf-8"))
 
-    items = []
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
+            f_out.flush()
+            os.fsync(f_out.fileno())
 
-        line = re.sub(r"\s{2,}", "\t", line)
-        p = line.split("\t")
+            processed_this_run += len(items)
+            checkpoint = {
+                "input_offset": next_offset,
+                "output_size": f_out.tell(),
+                "processed": checkpoint["processed"] + len(items),
+                "last_review_id": items[-1]["review_id"]
+            }
+            save_checkpoint(checkpoint)
 
-        if len(p) != 7:
-            print(f" ERREUR: Ligne mal formatée (cols={len(p)}) → {p}")
-            continue
+    if checkpoint["processed"] == 0:
+        print(f" ERREUR: Aucun avis valide trouvé dans `{INPUT_FILE}`.")
+        return None
+    return processed_this_run
 
-        rid, alias, name, rest_rating, review_id, review_rating, text = p  
+def main(argv=None):
+    args = parse_args(argv)
+
+    engine = args.engine
+    if inference_client.enabled():
+        # le service classe avec son propre moteur, quel que soit --engine : c'est lui qui indexe le cache
+        engine = inference_client.health()["sentiment_engine"]
+
+    cache = None
+    if not args.no_cache:
+        cache = SentimentCache(fingerprint=model_fingerprint(engine=engine))
+        if args.invalidate_cache:
+            removed = cache.invalidate(all_models=True)
+            print(f"DEBUG: Cache vidé ({removed} entrées supprimées)")
+
+    pool = None
+    if inference_client.enabled():
+        print(f"DEBUG: Classification confiée au service d'inférence {inference_client.service_url()} (moteur {engine})")
+
+        def classify(texts, batch_size):
+            return inference_client.classify(texts)
+    elif args.workers > 1:
+        threads = args.threads_per_worker or default_threads_per_worker(args.workers)
+        print(f"DEBUG: {args.workers} workers × {threads} threads, moteur {args.engine}")
+        pool = start_worker_pool(args.workers, threads, engine=args.engine)
+
+        def classify(texts, batch_size):
+            return classify_texts_parallel(texts, pool, args.workers, batch_size=batch_size, engine=args.engine)
+    else:
+        def classify(texts, batch_size):
+            return classify_texts(texts, batch_size=batch_size, engine=args.engine)
 
-        print(f"DEBUG: Avis extrait → {text}")  
+    def classify_batch(texts):
+        if cache is not None:
+            return classify_with_cache(texts, cache, classify, batch_size=args.batch_size)
+        return classify(texts, batch_size=args.batch_size)
 
-        items.append({
-            "restaurant_id": rid,
-            "alias": alias,
-            "name": name,
-            "restaurant_rating": rest_rating,
-            "review_id": review_id,
-            "review_rating": review_rating,
-            "text": text
-        })
+    try:
+        if args.tsv:
+            processed = classify_tsv(classify_batch, args)
+            destination = OUTPUT_FILE
+        else:
+            processed = classify_store(classify_batch)
+            destination = STORE_DIR
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if cache is not None:
+            print(cache.stats_line())
+            cache.close()
 
-    if len(items) == 0:
-        print(" ERREUR: Aucun avis valide trouvé dans `reviews_output.txt`.")
+    if processed is None:
         return
 
-    for it in items:
-        it["sentiment"] = compute_sentiment_camembert(it["text"])
-        print(f"DEBUG: Avis → {it['text']} | Sentiment détecté → {it['sentiment']}")
-
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        for it in items:
-            f.write(
-                f"{it['restaurant_id']}\t"
-                f"{it['alias']}\t"
-                f"{it['name']}\t"
-                f"{it['restaurant_rating']}\t"
-                f"{it['review_id']}\t"
-                f"{it['review_rating']}\t"
-                f"{it['text']}\t"
-                f"{it['sentiment']}\n"
-            )
-
-    print(f"✅ Succès: {len(items)} avis analysés avec le modèle `DistilCamemBERT` et écrits dans le fichier `{OUTPUT_FILE}`.")
+    print(f"✅ Succès: {processed} avis analysés avec le modèle `DistilCamemBERT` et écrits dans `{destination}`.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,69 +1,58 @@
 import os
 import re
-import torch
-import faiss
-import spacy
+import csv
+import numpy as np
 import pandas as pd
 import time
-import json
+import argparse
 from collections import Counter
-from keybert import KeyBERT
-from yake import KeywordExtractor
-from sentence_transformers import SentenceTransformer
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
 
-
-MODEL_NAME = "meta-llama/Llama-3.2-3B-Instruct"
-nlp = spacy.load("fr_core_news_md")
-kw_extractor = KeywordExtractor(lan="fr", n=3, top=30)
-kw_model = KeyBERT("all-mpnet-base-v2")
-
-encoder = SentenceTransformer("sentence-transformers/all-mpnet-base-v2")
-
-print(f"Chargement du modèle : {MODEL_NAME}")
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModelForCausalLM.from_pretrained(
-    MODEL_NAME,
-    device_map="auto",
-    torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32
+from src import inference_client
+from src.model_registry import register_model, get_model, report_load_times
+from src.keyphrase_batch import extract_yake_batch, extract_keybert_batch
+from src.lexicon import get_lexicon
+from src.vector_store import VectorStore
+from src.review_store import read_reviews, SENTIMENTS
+from src.summary_generation import (
+    GENERATION_KWARGS, NO_SUMMARY, has_trends, build_summary_prompt, clean_summary,
+    generate_texts, generate_summaries
 )
-
-text_generator = pipeline(
-    "text-generation",
-    model=model,
-    tokenizer=tokenizer,
-    max_new_tokens=400,
-    do_sample=False,
-    num_beams=1,
-    device_map="auto",
-    repetition_penalty=1.2,
-    temperature=0.1,
-    top_p=0.7
+from src.summary_cache import SummaryCache, DEFAULT_TTL_DAYS, DEFAULT_MAX_ENTRIES
+from src.summary_backends import (
+    MODEL_NAME, BACKENDS, DEFAULT_BACKEND, GGUF_FILES, DEFAULT_GGUF_QUANT,
+    ASSISTED_MODES, DEFAULT_ASSISTED_MODE, get_backend
 )
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-CONFIG_DIR = os.path.join(BASE_DIR, "..", "config")
+ENCODER_NAME = "sentence-transformers/all-mpnet-base-v2"
 
-TREND_INPUT_FILE = os.path.join(BASE_DIR, "trustpilot_reviews_with_sentiment_camembert.txt")
-TREND_OUTPUT_FILE = os.path.join(BASE_DIR, "trustpilot_sentiment_trends.txt")
+# les modèles sont chargés au premier usage : un appel à build_chunks ou clean_text,
+# ou un run sans synthèse, ne paie pas le chargement de spaCy / mpnet / Llama
+def _load_spacy():
+    import spacy
+    return spacy.load("fr_core_news_md")
 
-SYNONYMS_FILE  = os.path.join(CONFIG_DIR, "synonyms_map.json")
-REPLACE_FILE   = os.path.join(CONFIG_DIR, "replace_map.json")
-BLACKLIST_FILE = os.path.join(CONFIG_DIR, "blacklist.json")
+def _load_encoder():
+    # avec INFERENCE_SERVICE_URL, les vecteurs viennent du service qui garde mpnet chargé
+    if inference_client.enabled():
+        return inference_client.RemoteEncoder()
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(ENCODER_NAME)
 
-def load_config():
-    with open(SYNONYMS_FILE, "r", encoding="utf-8") as f:
-        synonyms_map = json.load(f)
+register_model("spacy_fr", _load_spacy)
+register_model("encoder", _load_encoder)
 
-    with open(REPLACE_FILE, "r", encoding="utf-8") as f:
-        replace_map = json.load(f)
-
-    with open(BLACKLIST_FILE, "r", encoding="utf-8") as f:
-        blacklist_data = json.load(f)
-        blacklist = set(blacklist_data)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-    return synonyms_map, replace_map, blacklist
+TREND_INPUT_FILE = os.path.join(BASE_DIR, "trustpilot_reviews_with_sentiment_camembert.txt")
+TREND_OUTPUT_FILE = os.path.join(BASE_DIR, "trustpilot_sentiment_trends.txt")
+# colonnes écrites par sentiment_camembert.format_line
+INPUT_COLUMNS = [
+    "restaurant_id", "alias", "name", "restaurant_rating",
+    "review_id", "review_rating", "text", "sentiment"
+]
+# colonnes lues dans le store Parquet
+TREND_COLUMNS = ["alias", "review_id", "text", "sentiment"]
 
 
 def clean_text(txt: str) -> str:
@@ -71,193 +60,212 @@ def clean_text(txt: str) -> str:
     txt = re.sub(r"[^\w\s']", "", txt)
     return txt.strip()
 
-def is_substantive_enough(phrase: str) -> bool:
-    doc = nlp(phrase)
+SIMILARITY_THRESHOLD = 0.85
+CONTEXT_PASSAGES = 10
+MMR_LAMBDA = 0.7
+SPACY_BATCH_SIZE = 256
+# le vecteur d'un Doc (moyenne des vecteurs statiques) et les POS n'ont besoin ni du parser ni du NER
+SPACY_DISABLED = ["parser", "ner", "lemmatizer"]
+
+def is_substantive_enough(phrase) -> bool:
+    doc = get_model("spacy_fr")(phrase) if isinstance(phrase, str) else phrase
     for token in doc:
         if token.pos_ in ("NOUN", "VERB", "PROPN"):
             return True
     return False
 
-def unify_synonyms(trend: str, synonyms_map: dict) -> str:
-    t_lower = trend.lower()
-    for canon_label, syn_list in synonyms_map.items():
-        for syn in syn_list:
-            if syn in t_lower:
-                return canon_label
-    return trend
-
-def refine_trends(trends, replace_map, synonyms_map):
+def refine_trends(trends, lexicon):
     if not trends or trends == ["Aucune tendance détectée"]:
         return ["Aucune tendance détectée"]
+
+    # remplacements, synonymes et blacklist en une seule passe de l'automate
+    applied = [lexicon.apply(t) for t in trends]
+    nlp = get_model("spacy_fr")
+    docs = list(nlp.pipe([t for t, _ in applied], batch_size=SPACY_BATCH_SIZE, disable=SPACY_DISABLED))
+
+    # similarité cosinus de toutes les paires en un seul produit matriciel (Doc.similarity vaut 0 sans vecteur)
+    vectors = np.array([doc.vector for doc in docs], dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1)
+    unit = vectors / np.where(norms == 0, 1.0, norms)[:, None]
+    similarity = unit @ unit.T
+
     refined = []
-    seen = set()
-    for t in trends:
-        for old_str, new_str in replace_map.items():
-            t = t.replace(old_str, new_str)
-
-        t = unify_synonyms(t, synonyms_map)
-        doc = nlp(t)
-        if len(doc) > 2 and not any(nlp(s).similarity(doc) > 0.85 for s in seen):
-            seen.add(t)
+    kept = []
+    for i, ((t, blacklisted), doc) in enumerate(zip(applied, docs)):
+        if len(doc) <= 2:
+            continue
+        if kept and similarity[i, kept].max() > SIMILARITY_THRESHOLD:
+            continue
+        kept.append(i)
+        # une tendance blacklistée sert encore à écarter ses quasi-doublons, mais n'est pas gardée ;
+        # les POS viennent du même passage spaCy
+        if not blacklisted and is_substantive_enough(doc):
             refined.append(t)
     return refined
 
-def extract_trends(texts, sentiment, top_n=20):
+def extract_trends(texts, sentiment, top_n=20, yake_workers=None):
     if not texts:
         return ["Aucune tendance détectée"]
 
-    synonyms_map, replace_map, blacklist = load_config()
-    # print("blacklist chargée :", blacklist)
+    lexicon = get_lexicon()
+
+    # YAKE sur un pool de processus, KeyBERT sur tout le groupe d'un coup (vocabulaire ajusté une fois,
+    # documents et n-grammes candidats encodés par gros batchs avec l'encodeur mpnet partagé)
+    if inference_client.enabled():
+        yake_kws, keybert_kws = inference_client.extract_keywords(texts)
+    else:
+        yake_kws = extract_yake_batch(texts, workers=yake_workers)
+        keybert_kws = extract_keybert_batch(texts, get_model("encoder"))
 
     all_trends = []
-    for txt in texts:
-        yake_kws = kw_extractor.extract_keywords(txt)
-        keybert_kws = kw_model.extract_keywords(
-            txt,
-            keyphrase_ngram_range=(2, 8),
-            stop_words="french",
-            top_n=5
-        )
-        all_trends.extend([k[0] for k in yake_kws if 2 < len(k[0].split()) <= 6])
-        all_trends.extend([k[0] for k in keybert_kws if 2 < len(k[0].split()) <= 6])
+    for yake_doc, keybert_doc in zip(yake_kws, keybert_kws):
+        all_trends.extend([k for k in yake_doc if 2 < len(k.split()) <= 6])
+        all_trends.extend([k for k in keybert_doc if 2 < len(k.split()) <= 6])
 
     freq = Counter(all_trends)
     extracted = [
         p for (p, c) in freq.most_common()
-        if c >= 3 and p not in blacklist
+        if c >= 3 and not lexicon.is_blacklisted(p)
     ][:top_n]
 
-    refined = refine_trends(extracted, replace_map, synonyms_map)
-
-    candidate_trends = []
-    for t in refined:
-        if is_substantive_enough(t):
-            candidate_trends.append(t)
-    refined = candidate_trends
+    refined = refine_trends(extracted, lexicon)
 
     final_list = []
     for trend in refined:
         nb_words = len(trend.split())
-        if 3 <= nb_words <= 8 and not any(bad in trend.lower() for bad in blacklist):
+        if 3 <= nb_words <= 8:
             final_list.append(trend)
 
     return final_list if final_list else ["Aucune tendance détectée"]
 
 
-def build_chunks(texts, min_words=5):
+def build_chunks(df, min_words=5):
+    # un chunk par phrase d'avis, avec sa provenance (sentiment, avis, domaine)
     chunks = []
-    for txt in texts:
+    for txt, sentiment, review_id, domain in zip(df["clean_text"], df["sentiment"], df["review_id"], df["alias"]):
         paragraphs = txt.split(".")
         for p in paragraphs:
             p = p.strip()
             if len(p.split()) >= min_words:
-                chunks.append(p)
+                chunks.append({"text": p, "sentiment": sentiment, "review_id": review_id, "domain": domain})
     return chunks
 
 def build_vector_store(chunks):
-    embeddings = encoder.encode(chunks, convert_to_tensor=False)
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings)
-    return index, embeddings
-
-def retrieve_passages_for_trend(trend, index, embeddings, chunks, top_k=3):
-    q_emb = encoder.encode([trend], convert_to_tensor=False)
-    distances, ids = index.search(q_emb, top_k)
-    results = []
-    for idx in ids[0]:
-        results.append(chunks[idx])
-    return results
-
-
-def postprocess_limited_sentences(text: str, max_sentences: int = 0) -> str:
-    if max_sentences <= 0:
-        return text.strip()
-    sentences = [s.strip() for s in text.split('.') if s.strip()]
-    limited = '. '.join(sentences[:max_sentences]).strip()
-    if limited and not limited.endswith('.'):
-        limited += '.'
-    return limited
-
-def remove_incomplete_ending(summary: str) -> str:
-    sentences = [s.strip() for s in summary.split('.') if s.strip()]
-    if not sentences:
-        return summary.strip()
-    last_sentence = sentences[-1]
-    words = last_sentence.split()
-    if len(words) < 5:
-        sentences.pop()
-    else:
-        last_word = words[-1].lower().strip(",;!?'.-")
-        if last_word.endswith("é") or last_word.endswith("è") or last_word.endswith("ai"):
-            sentences.pop()
-    final = '. '.join(sentences).strip()
-    if final and not final.endswith('.'):
-        final += '.'
-    return final
-
-
-def rag_generate_summary(trends, sentiment_type, index, embeddings, chunks):
-    if not trends or trends == ["Aucune tendance détectée"]:
-        return "Aucune idée générale détectée."
-
-    short_text = ", ".join(trends)
-    all_passages = []
-    for t in trends:
-        top_passages = retrieve_passages_for_trend(t, index, embeddings, chunks, top_k=3)
-        all_passages.extend(top_passages)
-
-    best_passages = all_passages[:10]
-    context_block = "\n".join(best_passages)
-
-    if sentiment_type == "positifs":
-        prompt = (
-            f"Voici plusieurs extraits d'avis positifs sur : {short_text}.\n"
-            f"{context_block}\n\n"
-            "Rédige un unique paragraphe concis (3 à 5 phrases). "
-            "Ne parle pas des avis négatifs ou neutres. "
-            "Évite toute formule de politesse ou liste de points. "
-            "Reste descriptif et objectif."
-        )
-    elif sentiment_type == "négatifs":
-        prompt = (
-            f"Voici plusieurs extraits d'avis négatifs sur : {short_text}.\n"
-            f"{context_block}\n\n"
-            "Rédige un unique paragraphe concis (3 à 5 phrases). "
-            "Ne parle pas des avis positifs ou neutres. "
-            "Évite toute formule de politesse ou liste de points. "
-            "Reste descriptif et objectif."
-        )
-    else:
-        prompt = (
-            f"Voici plusieurs extraits d'avis neutres sur : {short_text}.\n"
-            f"{context_block}\n\n"
-            "Rédige un unique paragraphe concis (3 à 5 phrases). "
-            "Ne parle pas des avis positifs ou négatifs. "
-            "Évite toute formule de politesse ou liste de points. "
-            "Reste descriptif et objectif."
+    # index FAISS persistant : seuls les chunks nouveaux sont encodés, ceux disparus sont supprimés ;
+    # un store à l'ancien format est vidé ici, l'étape qui le reconstruit
+    store = VectorStore(encoder_name=ENCODER_NAME, migrate=True)
+    store.sync(chunks, get_model("encoder"))
+    return store
+
+def mmr_select(query_relevance, candidate_embeddings, k, lambda_mult=MMR_LAMBDA):
+    # max-marginal-relevance : pertinence pour les tendances moins redondance avec les passages déjà choisis
+    selected = []
+    remaining = list(range(len(query_relevance)))
+    redundancy = np.zeros(len(query_relevance), dtype=np.float32)
+    while remaining and len(selected) < k:
+        scores = [lambda_mult * query_relevance[i] - (1 - lambda_mult) * redundancy[i] for i in remaining]
+        best = remaining.pop(int(np.argmax(scores)))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, candidate_embeddings @ candidate_embeddings[best])
+    return selected
+
+def retrieve_passages_for_trends(trends_by_sentiment, store, top_k=3, max_passages=CONTEXT_PASSAGES):
+    # trends_by_sentiment : {"POSITIVE": [...], "NEGATIVE": [...], "NEUTRAL": [...]}
+    passages = {sentiment: [] for sentiment in trends_by_sentiment}
+    queries = {
+        sentiment: trends for sentiment, trends in trends_by_sentiment.items()
+        if trends and trends != ["Aucune tendance détectée"]
+    }
+    if not queries:
+        return passages
+
+    # toutes les tendances de tous les sentiments en un seul encodage,
+    # puis une recherche multi-requêtes dans le sous-index de chaque sentiment
+    all_trends = [t for trends in queries.values() for t in trends]
+    q_emb = np.asarray(get_model("encoder").encode(all_trends, convert_to_tensor=False), dtype=np.float32)
+
+    start = 0
+    for sentiment, trends in queries.items():
+        # un passage retrouvé par plusieurs tendances, ou présent dans plusieurs avis, n'est gardé
+        # qu'une fois : MMR ne fait que pénaliser les doublons, il ne les exclut pas
+        relevance = store.search_distinct(q_emb[start:start + len(trends)], top_k, sentiment)
+        start += len(trends)
+        if not relevance:
+            continue
+        candidate_ids = list(relevance)
+        chosen = mmr_select(
+            np.array([relevance[i] for i in candidate_ids], dtype=np.float32),
+            store.embeddings(candidate_ids),
+            max_passages
         )
-
-    out = text_generator(prompt)
-    full_text = out[0]["generated_text"].strip()
-
-    if full_text.startswith(prompt):
-        summary = full_text[len(prompt):].strip()
-    else:
-        summary = full_text
-
-    summary = re.sub(r"(?i)si tu veux continuer.*", "", summary)
-    summary = re.sub(r"(?i)remplacez le paragraphe.*", "", summary)
-
-    max_sentences = 5
-    summary = postprocess_limited_sentences(summary, max_sentences)
-    summary = remove_incomplete_ending(summary)
-    return summary
-
-def main():
+        passages[sentiment] = store.texts([candidate_ids[i] for i in chosen])
+    return passages
+
+
+def rag_generate_summary(trends, sentiment_type, passages, cache=None):
+    # chemin séquentiel (un prompt par appel du pipeline), gardé pour comparer au lot
+    if not has_trends(trends):
+        return NO_SUMMARY
+
+    def generate(prompts):
+        from transformers import StoppingCriteriaList
+        from src.generation_stopping import SentenceLimitCriteria, SentenceStreamer
+
+        generator = get_model("text_generator")
+        texts = []
+        for prompt in prompts:
+            prompt_length = len(generator.tokenizer(prompt)["input_ids"])
+            out = generator(
+                prompt,
+                return_full_text=False,
+                stopping_criteria=StoppingCriteriaList([SentenceLimitCriteria(generator.tokenizer, prompt_length)]),
+                streamer=SentenceStreamer(generator.tokenizer, GENERATION_KWARGS["max_new_tokens"])
+            )
+            texts.append(out[0]["generated_text"].strip())
+        return texts
+
+    prompt = build_summary_prompt(trends, sentiment_type, passages)
+    summary = generate_texts([prompt], generate, cache, MODEL_NAME)[0]
+    return clean_summary(summary)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Tendances et synthèses des avis par sentiment")
+    parser.add_argument("--tsv", action="store_true",
+                        help=f"lit {os.path.basename(TREND_INPUT_FILE)} au lieu du store Parquet")
+    parser.add_argument("--domain", action="append", default=None,
+                        help="limite l'analyse à un domaine (option répétable)")
+    parser.add_argument("--skip-summaries", action="store_true",
+                        help="n'extrait que les tendances, sans FAISS ni Llama")
+    parser.add_argument("--top-n", type=int, default=20,
+                        help="nombre de tendances candidates gardées avant dédoublonnage")
+    parser.add_argument("--summary-backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help="hf (transformers), llama-cpp (GGUF quantifié) ou stub (sans modèle, pour les tests)")
+    parser.add_argument("--gguf-quant", choices=list(GGUF_FILES), default=DEFAULT_GGUF_QUANT,
+                        help="quantification du modèle GGUF pour --summary-backend llama-cpp")
+    parser.add_argument("--assisted-decoding", choices=ASSISTED_MODES, default=DEFAULT_ASSISTED_MODE,
+                        help="décodage assisté pour --summary-backend hf : recherche dans le prompt ou modèle brouillon 1B")
+    parser.add_argument("--sequential-summaries", action="store_true",
+                        help="génère les trois synthèses une par une via le pipeline HF au lieu d'un seul lot")
+    parser.add_argument("--no-summary-cache", action="store_true",
+                        help="régénère les synthèses sans lire ni écrire summary_cache.sqlite")
+    parser.add_argument("--summary-cache-ttl", type=float, default=DEFAULT_TTL_DAYS,
+                        help="durée de validité d'une synthèse en cache, en jours (0 = sans limite)")
+    parser.add_argument("--summary-cache-size", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="nombre maximal de synthèses gardées (les moins récemment utilisées sont supprimées)")
+    return parser.parse_args(argv)
+
+def load_reviews(tsv=False, domains=None):
+    if tsv:
+        return pd.read_csv(TREND_INPUT_FILE, sep="\t", header=None, names=INPUT_COLUMNS, dtype=str,
+                           quoting=csv.QUOTE_NONE, keep_default_na=False)
+    # seules les colonnes utiles sont lues, et seulement les avis déjà classés
+    return read_reviews(columns=TREND_COLUMNS, sentiments=SENTIMENTS, domains=domains)
+
+def main(argv=None):
+    args = parse_args(argv)
     start_time = time.time()
 
-    df = pd.read_csv(TREND_INPUT_FILE, sep="\t", header=None, names=["text","sentiment"])
+    df = load_reviews(args.tsv, args.domain)
     df["clean_text"] = df["text"].apply(clean_text)
 
     pos_reviews = df[df["sentiment"]=="POSITIVE"]["clean_text"].tolist()
@@ -266,17 +274,43 @@ def main():
 
     total = len(df)
 
-    pos_trends = extract_trends(pos_reviews, "positif")
-    neg_trends = extract_trends(neg_reviews, "négatif")
-    neu_trends = extract_trends(neu_reviews, "neutre")
+    pos_trends = extract_trends(pos_reviews, "positif", top_n=args.top_n)
+    neg_trends = extract_trends(neg_reviews, "négatif", top_n=args.top_n)
+    neu_trends = extract_trends(neu_reviews, "neutre", top_n=args.top_n)
 
-    all_texts = pos_reviews + neg_reviews + neu_reviews
-    chunks = build_chunks(all_texts, min_words=5)
-    index, embeddings = build_vector_store(chunks)
+    if args.skip_summaries:
+        pos_summary = neg_summary = neu_summary = "Synthèse non générée (--skip-summaries)."
+    else:
+        chunks = build_chunks(df[df["sentiment"].isin(["POSITIVE", "NEGATIVE", "NEUTRAL"])], min_words=5)
+        store = build_vector_store(chunks)
 
-    pos_summary = rag_generate_summary(pos_trends, "positifs", index, embeddings, chunks)
-    neg_summary = rag_generate_summary(neg_trends, "négatifs", index, embeddings, chunks)
-    neu_summary = rag_generate_summary(neu_trends, "neutres", index, embeddings, chunks)
+        passages = retrieve_passages_for_trends(
+            {"POSITIVE": pos_trends, "NEGATIVE": neg_trends, "NEUTRAL": neu_trends}, store
+        )
+        store.close()
+
+        items = [
+            (pos_trends, "positifs", passages["POSITIVE"]),
+            (neg_trends, "négatifs", passages["NEGATIVE"]),
+            (neu_trends, "neutres", passages["NEUTRAL"]),
+        ]
+        cache = None
+        if not args.no_summary_cache:
+            cache = SummaryCache(ttl_days=args.summary_cache_ttl, max_entries=args.summary_cache_size)
+        # le modèle n'est chargé que si au moins une synthèse manque dans le cache
+        if args.sequential_summaries:
+            pos_summary, neg_summary, neu_summary = [rag_generate_summary(*item, cache=cache) for item in items]
+        else:
+            options = {}
+            if args.summary_backend == "llama-cpp":
+                options = {"quant": args.gguf_quant}
+            elif args.summary_backend == "hf":
+                options = {"assisted": args.assisted_decoding}
+            backend = get_backend(args.summary_backend, **options)
+            pos_summary, neg_summary, neu_summary = generate_summaries(items, backend, cache)
+        if cache is not None:
+            print(cache.stats_line())
+            cache.close()
 
     with open(TREND_OUTPUT_FILE, "w", encoding="utf-8") as f:
         f.write("Répartition des sentiments :\n")
@@ -309,6 +343,7 @@ def main():
     elapsed_time = end_time - start_time
     print(f"✅ Résumé enregistré dans {TREND_OUTPUT_FILE}.")
     print(f"Temps d'exécution: {elapsed_time:.2f} secondes.")
+    report_load_times()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
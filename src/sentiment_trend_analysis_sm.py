@@ -1,11 +1,14 @@
 import os
 import re
+import sys
 from collections import Counter
 from sumy.parsers.plaintext import PlaintextParser
 from sumy.nlp.tokenizers import Tokenizer
 from sumy.summarizers.lex_rank import LexRankSummarizer
 from sklearn.feature_extraction.text import TfidfVectorizer
 
+from src.review_store import read_reviews, SENTIMENTS
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 INPUT_FILE = os.path.join(BASE_DIR, "Detail_justificatif_SM_with_sentiment.txt")
 OUTPUT_FILE = os.path.join(BASE_DIR, "Detail_justificatif_SM_summaries.txt")
@@ -21,23 +24,23 @@ CUSTOM_STOPWORDS = [
     "suite","ni","2024","2025"
 ]
 
-def load_data():
+def load_data(path=None):
+    # store Parquet par défaut ; `path` : ancien fichier TSV texte\tsentiment
+    if path is None:
+        df = read_reviews(columns=["text", "sentiment"], sentiments=SENTIMENTS)
+        rows = zip(df["text"].tolist(), df["sentiment"].tolist())
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            parts = (line.rstrip("\r\n").split("\t") for line in f)
+            rows = [(p[0], p[1].strip().upper()) for p in parts if len(p) >= 2 and p[0].strip()]
     pos_lines, neg_lines, neu_lines = [], [], []
-    with open(INPUT_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            row = line.strip()
-            if not row:
-                continue
-            parts = row.split("\t")
-            if len(parts) < 2:
-                continue
-            text, senti = parts[0], parts[1].upper()
-            if senti == "POSITIVE":
-                pos_lines.append(text)
-            elif senti == "NEGATIVE":
-                neg_lines.append(text)
-            else:
-                neu_lines.append(text)
+    for text, senti in rows:
+        if senti == "POSITIVE":
+            pos_lines.append(text)
+        elif senti == "NEGATIVE":
+            neg_lines.append(text)
+        else:
+            neu_lines.append(text)
     return pos_lines, neg_lines, neu_lines
 
 def build_top_words(lines, top_k):
@@ -82,7 +85,7 @@ def sumy_extract(lines, nb_sentences):
     return [str(s).strip() for s in extracted]
 
 def main():
-    pos_lines, neg_lines, neu_lines = load_data()
+    pos_lines, neg_lines, neu_lines = load_data(INPUT_FILE if "--tsv" in sys.argv[1:] else None)
     total = len(pos_lines) + len(neg_lines) + len(neu_lines)
 
     with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
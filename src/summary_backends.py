@@ -0,0 +1,186 @@
+import os
+
+from src import config, inference_client
+from src.model_registry import register_model, get_model
+from src.summary_generation import (
+    GENERATION_KWARGS, MAX_SUMMARY_SENTENCES, count_completed_sentences, generate_batch, generate_assisted
+)
+
+MODEL_NAME = "meta-llama/Llama-3.2-3B-Instruct"
+# même tokenizer que le modèle cible, condition du décodage assisté
+DRAFT_MODEL_NAME = "meta-llama/Llama-3.2-1B-Instruct"
+ASSISTED_MODES = ("none", "prompt-lookup", "draft")
+DEFAULT_ASSISTED_MODE = os.environ.get("SUMMARY_ASSISTED_DECODING", "none")
+
+BACKENDS = ("hf", "llama-cpp", "stub", "remote")
+# "remote" : synthèses générées par le service d'inférence (src/inference_service.py) s'il est configuré
+DEFAULT_BACKEND = os.environ.get("SUMMARY_BACKEND", "remote" if config.INFERENCE_SERVICE_URL else "hf")
+
+# même modèle quantifié au format GGUF, en 4 ou 8 bits
+GGUF_REPO = "bartowski/Llama-3.2-3B-Instruct-GGUF"
+GGUF_FILES = {
+    "q4_k_m": "Llama-3.2-3B-Instruct-Q4_K_M.gguf",
+    "q8_0": "Llama-3.2-3B-Instruct-Q8_0.gguf",
+}
+DEFAULT_GGUF_QUANT = os.environ.get("LLAMA_CPP_QUANT", "q4_k_m")
+LLAMA_CPP_CONTEXT = 4096
+
+
+def _load_text_generator():
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    model = AutoModelForCausalLM.from_pretrained(
+        MODEL_NAME,
+        device_map="auto",
+        torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32
+    )
+
+    return pipeline(
+        "text-generation",
+        model=model,
+        tokenizer=tokenizer,
+        device_map="auto",
+        **GENERATION_KWARGS
+    )
+
+
+def _load_draft_model():
+    import torch
+    from transformers import AutoModelForCausalLM
+
+    return AutoModelForCausalLM.from_pretrained(
+        DRAFT_MODEL_NAME,
+        device_map="auto",
+        torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32
+    )
+
+
+def _load_llama_cpp(quant):
+    from llama_cpp import Llama
+
+    if quant not in GGUF_FILES:
+        raise ValueError(f"Quantification GGUF inconnue : {quant} (attendu : {', '.join(GGUF_FILES)})")
+    return Llama.from_pretrained(
+        repo_id=GGUF_REPO,
+        filename=GGUF_FILES[quant],
+        n_ctx=LLAMA_CPP_CONTEXT,
+        n_threads=os.cpu_count(),
+        verbose=False
+    )
+
+
+register_model("text_generator", _load_text_generator)
+register_model("draft_model", _load_draft_model)
+for _quant in GGUF_FILES:
+    register_model(f"llama_cpp_{_quant}", lambda quant=_quant: _load_llama_cpp(quant))
+
+
+class HFBackend:
+    # pipeline transformers en pleine précision : génération en lot (summary_generation.generate_batch),
+    # ou prompt par prompt en décodage assisté, qui donne la même sortie gloutonne
+    name = "hf"
+
+    def __init__(self, assisted=DEFAULT_ASSISTED_MODE):
+        if assisted not in ASSISTED_MODES:
+            raise ValueError(f"Décodage assisté inconnu : {assisted} (attendu : {', '.join(ASSISTED_MODES)})")
+        self.assisted = assisted
+        self.model_id = MODEL_NAME
+        self.generation_kwargs = GENERATION_KWARGS
+        self.last_stats = []
+
+    def load(self):
+        if self.assisted == "draft":
+            get_model("draft_model")
+        return get_model("text_generator")
+
+    def generate(self, prompts):
+        generator = self.load()
+        if self.assisted == "none":
+            return generate_batch(prompts, generator.model, generator.tokenizer, self.generation_kwargs)
+        assistant = get_model("draft_model") if self.assisted == "draft" else None
+        texts, self.last_stats = generate_assisted(
+            prompts, generator.model, generator.tokenizer, self.generation_kwargs, assistant_model=assistant
+        )
+        return texts
+
+
+class LlamaCppBackend:
+    # modèle GGUF quantifié via llama-cpp-python ; température 0 = décodage glouton
+    name = "llama-cpp"
+
+    def __init__(self, quant=DEFAULT_GGUF_QUANT):
+        self.quant = quant
+        self.model_id = f"{GGUF_REPO}/{GGUF_FILES[quant]}"
+        self.generation_kwargs = {
+            "max_tokens": GENERATION_KWARGS["max_new_tokens"],
+            "temperature": 0.0,
+            "repeat_penalty": GENERATION_KWARGS["repetition_penalty"],
+        }
+
+    def load(self):
+        return get_model(f"llama_cpp_{self.quant}")
+
+    def generate(self, prompts):
+        llm = self.load()
+        texts = []
+        for prompt in prompts:
+            # llama.cpp traite un prompt à la fois ; le flux permet le même arrêt à 5 phrases que HF
+            text = ""
+            for chunk in llm.create_completion(prompt, stream=True, **self.generation_kwargs):
+                text += chunk["choices"][0]["text"]
+                if count_completed_sentences(text) >= MAX_SUMMARY_SENTENCES:
+                    break
+            texts.append(text)
+        return texts
+
+
+class StubBackend:
+    # pas de modèle : reprend les premiers passages du contexte, pour tester la chaîne sans LLM
+    name = "stub"
+
+    def __init__(self):
+        self.model_id = "stub"
+        self.generation_kwargs = {}
+
+    def load(self):
+        return None
+
+    def generate(self, prompts):
+        texts = []
+        for prompt in prompts:
+            passages = [line.strip().rstrip(".") for line in prompt.split("\n")[1:] if line.strip()][:-1]
+            texts.append(". ".join(passages[:MAX_SUMMARY_SENTENCES]) + ".")
+        return texts
+
+
+class RemoteBackend:
+    # modèle gardé chargé par le service d'inférence ; le cache de synthèses reste local et
+    # indexé par le modèle réellement servi
+    name = "remote"
+
+    def __init__(self):
+        if not inference_client.enabled():
+            raise ValueError("Backend remote : INFERENCE_SERVICE_URL n'est pas renseignée")
+        info = inference_client.health()
+        self.model_id = info["summary_model_id"]
+        self.generation_kwargs = info["summary_generation_kwargs"]
+
+    def load(self):
+        return None
+
+    def generate(self, prompts):
+        return inference_client.summarize(prompts)
+
+
+def get_backend(name=DEFAULT_BACKEND, **options):
+    if name == "hf":
+        return HFBackend(**options)
+    if name == "llama-cpp":
+        return LlamaCppBackend(**options)
+    if name == "stub":
+        return StubBackend()
+    if name == "remote":
+        return RemoteBackend()
+    raise ValueError(f"Backend de synthèse inconnu : {name} (attendu : {', '.join(BACKENDS)})")
@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_FILE = os.path.join(BASE_DIR, "summary_cache.sqlite")
+
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_ENTRIES = 2000
+
+
+def summary_key(model_id, prompt, generation_kwargs):
+    # le texte généré ne dépend que du modèle, du prompt exact et des paramètres de génération
+    payload = json.dumps({
+        "model": model_id,
+        "prompt": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        "generation": generation_kwargs,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    # textes bruts générés par le LLM ; le post-traitement est refait à la lecture
+    def __init__(self, path=CACHE_FILE, ttl_days=DEFAULT_TTL_DAYS, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl_days * 86400 if ttl_days else None
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, text TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used)")
+        self.conn.commit()
+
+    def _expired(self, created_at, now):
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def get(self, key):
+        now = time.time()
+        row = self.conn.execute("SELECT text, created_at FROM summaries WHERE key = ?", (key,)).fetchone()
+        if row is None or self._expired(row[1], now):
+            if row is not None:
+                self.conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+                self.conn.commit()
+            self.misses += 1
+            return None
+        self.conn.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (now, key))
+        self.conn.commit()
+        self.hits += 1
+        return row[0]
+
+    def put(self, key, model_id, text):
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO summaries (key, model, text, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, model_id, text, now, now)
+        )
+        self.conn.commit()
+        self.evict()
+
+    def evict(self):
+        # entrées expirées, puis les moins récemment utilisées au-delà de max_entries
+        removed = 0
+        if self.ttl is not None:
+            removed += self.conn.execute(
+                "DELETE FROM summaries WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+        if self.max_entries:
+            removed += self.conn.execute(
+                "DELETE FROM summaries WHERE key NOT IN "
+                "(SELECT key FROM summaries ORDER BY last_used DESC LIMIT ?)", (self.max_entries,)
+            ).rowcount
+        self.conn.commit()
+        return removed
+
+    def clear(self):
+        cur = self.conn.execute("DELETE FROM summaries")
+        self.conn.commit()
+        return cur.rowcount
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+    def stats_line(self):
+        return f"Cache synthèses : {self.hits} hits, {self.misses} misses"
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("stats", "purge", "clear"):
+        print("Usage: python -m src.summary_cache <stats|purge|clear>")
+        print("  purge : supprime les entrées expirées et celles au-delà de la taille maximale")
+        print("  clear : vide entièrement le cache")
+        sys.exit(1)
+
+    cache = SummaryCache()
+    action = sys.argv[1]
+    if action == "stats":
+        print(f"{cache.count()} synthèses dans {cache.path}")
+        for model, count in cache.conn.execute("SELECT model, COUNT(*) FROM summaries GROUP BY model"):
+            print(f"  {model} : {count}")
+    elif action == "purge":
+        print(f"✅ {cache.evict()} entrées supprimées de {cache.path}")
+    else:
+        print(f"✅ {cache.clear()} entrées supprimées de {cache.path}")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import re
+import time
+
+from src.summary_cache import summary_key
+
+# mêmes réglages que le pipeline text-generation : décodage glouton, donc sortie déterministe
+GENERATION_KWARGS = {
+    "max_new_tokens": 400,
+    "do_sample": False,
+    "num_beams": 1,
+    "repetition_penalty": 1.2,
+    "temperature": 0.1,
+    "top_p": 0.7,
+}
+MAX_SUMMARY_SENTENCES = 5
+NO_SUMMARY = "Aucune idée générale détectée."
+# token de padding jamais généré : la pénalité de répétition, qui voit aussi le padding,
+# ne doit pas toucher un token utile (l'EOS en particulier)
+FALLBACK_PAD_TOKEN = "<|finetune_right_pad_id|>"
+# longueur maximale d'une suite de tokens recopiée du prompt (décodage assisté par le prompt)
+PROMPT_LOOKUP_TOKENS = 10
+
+EXCLUDED_SENTIMENTS = {
+    "positifs": "négatifs ou neutres",
+    "négatifs": "positifs ou neutres",
+    "neutres": "positifs ou négatifs",
+}
+
+
+def has_trends(trends):
+    return bool(trends) and trends != ["Aucune tendance détectée"]
+
+
+def build_summary_prompt(trends, sentiment_type, passages):
+    short_text = ", ".join(trends)
+    context_block = "\n".join(passages)
+    return (
+        f"Voici plusieurs extraits d'avis {sentiment_type} sur : {short_text}.\n"
+        f"{context_block}\n\n"
+        "Rédige un unique paragraphe concis (3 à 5 phrases). "
+        f"Ne parle pas des avis {EXCLUDED_SENTIMENTS[sentiment_type]}. "
+        "Évite toute formule de politesse ou liste de points. "
+        "Reste descriptif et objectif."
+    )
+
+
+def postprocess_limited_sentences(text: str, max_sentences: int = 0) -> str:
+    if max_sentences <= 0:
+        return text.strip()
+    sentences = [s.strip() for s in text.split('.') if s.strip()]
+    limited = '. '.join(sentences[:max_sentences]).strip()
+    if limited and not limited.endswith('.'):
+        limited += '.'
+    return limited
+
+def remove_incomplete_ending(summary: str) -> str:
+    sentences = [s.strip() for s in summary.split('.') if s.strip()]
+    if not sentences:
+        return summary.strip()
+    last_sentence = sentences[-1]
+    words = last_sentence.split()
+    if len(words) < 5:
+        sentences.pop()
+    else:
+        last_word = words[-1].lower().strip(",;!?'.-")
+        if last_word.endswith("é") or last_word.endswith("è") or last_word.endswith("ai"):
+            sentences.pop()
+    final = '. '.join(sentences).strip()
+    if final and not final.endswith('.'):
+        final += '.'
+    return final
+
+def _strip_boilerplate(summary):
+    summary = re.sub(r"(?i)si tu veux continuer.*", "", summary.strip())
+    return re.sub(r"(?i)remplacez le paragraphe.*", "", summary)
+
+def clean_summary(summary):
+    summary = postprocess_limited_sentences(_strip_boilerplate(summary), MAX_SUMMARY_SENTENCES)
+    return remove_incomplete_ending(summary)
+
+def count_completed_sentences(text):
+    # même découpage que clean_summary : les phrases terminées par un point, après nettoyage
+    return sum(1 for s in _strip_boilerplate(text).split('.')[:-1] if s.strip())
+
+
+def _pad_token_id(tokenizer):
+    if tokenizer.pad_token_id is not None:
+        return tokenizer.pad_token_id
+    pad_id = tokenizer.convert_tokens_to_ids(FALLBACK_PAD_TOKEN)
+    if pad_id is not None and pad_id != tokenizer.unk_token_id:
+        return pad_id
+    return tokenizer.eos_token_id
+
+
+def generate_batch(prompts, model, tokenizer, generation_kwargs=GENERATION_KWARGS):
+    # un seul appel à generate pour tous les prompts, complétés à gauche ;
+    # renvoie seulement le texte généré après chaque prompt
+    import torch
+
+    encoded = [tokenizer(p)["input_ids"] for p in prompts]
+    pad_id = _pad_token_id(tokenizer)
+    width = max(len(e) for e in encoded)
+    input_ids = torch.tensor([[pad_id] * (width - len(e)) + e for e in encoded], device=model.device)
+    attention_mask = torch.tensor([[0] * (width - len(e)) + [1] * len(e) for e in encoded], device=model.device)
+
+    from src.generation_stopping import SentenceLimitCriteria, report_generation
+    from transformers import StoppingCriteriaList
+
+    # arrêt ligne par ligne dès MAX_SUMMARY_SENTENCES phrases : clean_summary jetterait la suite
+    sentence_limit = SentenceLimitCriteria(tokenizer, input_ids.shape[1])
+    start = time.perf_counter()
+    with torch.inference_mode():
+        output = model.generate(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            pad_token_id=pad_id,
+            stopping_criteria=StoppingCriteriaList([sentence_limit]),
+            **generation_kwargs
+        )
+
+    elapsed = time.perf_counter() - start
+
+    new_tokens = output[:, input_ids.shape[1]:]
+    generated = (new_tokens != pad_id).sum(dim=1).tolist()
+    report_generation(generated, sentence_limit.stopped, generation_kwargs["max_new_tokens"], elapsed)
+    return tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+
+
+def generate_assisted(prompts, model, tokenizer, generation_kwargs=GENERATION_KWARGS,
+                      assistant_model=None, prompt_lookup_tokens=PROMPT_LOOKUP_TOKENS):
+    # décodage assisté : les tokens proposés par un petit modèle brouillon (assistant_model),
+    # ou recopiés du contexte (prompt lookup), sont vérifiés en une passe du modèle cible ;
+    # en glouton la sortie est la même. transformers ne le gère qu'un prompt à la fois.
+    # renvoie (textes, [{"tokens", "seconds", "acceptance"} par prompt]) ; acceptance vaut None
+    # si le comptage des candidats n'est pas disponible (generation_stopping.CandidateCounter)
+    import torch
+    from transformers import StoppingCriteriaList
+    from src.generation_stopping import SentenceLimitCriteria, CandidateCounter, report_generation
+
+    if assistant_model is not None:
+        assistance = {"assistant_model": assistant_model}
+    else:
+        assistance = {"prompt_lookup_num_tokens": prompt_lookup_tokens}
+
+    texts, stats = [], []
+    for prompt in prompts:
+        input_ids = tokenizer(prompt, return_tensors="pt")["input_ids"].to(model.device)
+        sentence_limit = SentenceLimitCriteria(tokenizer, input_ids.shape[1])
+        start = time.perf_counter()
+        with torch.inference_mode(), CandidateCounter(model) as counter:
+            output = model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                pad_token_id=_pad_token_id(tokenizer),
+                stopping_criteria=StoppingCriteriaList([sentence_limit]),
+                **generation_kwargs,
+                **assistance
+            )
+        elapsed = time.perf_counter() - start
+
+        new_tokens = output[0, input_ids.shape[1]:]
+        acceptance = counter.acceptance_rate(len(new_tokens))
+        report_generation([len(new_tokens)], sentence_limit.stopped, generation_kwargs["max_new_tokens"], elapsed)
+        if acceptance is None:
+            print("DEBUG: Décodage assisté : taux d'acceptation indisponible avec cette version de transformers")
+        else:
+            print(
+                f"DEBUG: Décodage assisté : {counter.proposed} tokens proposés, {acceptance * 100:.1f}% acceptés, "
+                f"{len(new_tokens) / max(counter.iterations, 1):.2f} tokens par passe"
+            )
+        texts.append(tokenizer.decode(new_tokens, skip_special_tokens=True))
+        stats.append({"tokens": len(new_tokens), "seconds": elapsed, "acceptance": acceptance})
+    return texts, stats
+
+
+def generate_texts(prompts, generate, cache=None, model_name="", generation_kwargs=GENERATION_KWARGS):
+    # generate(prompts) -> textes générés ; seuls les prompts absents du cache sont envoyés au modèle
+    if cache is None:
+        return generate(prompts)
+
+    keys = [summary_key(model_name, p, generation_kwargs) for p in prompts]
+    texts = [cache.get(key) for key in keys]
+    missing = [k for k, text in enumerate(texts) if text is None]
+    if missing:
+        for k, text in zip(missing, generate([prompts[k] for k in missing])):
+            texts[k] = text
+            cache.put(keys[k], model_name, text)
+    return texts
+
+
+def generate_summaries(items, backend, cache=None):
+    # items : liste de (tendances, "positifs" | "négatifs" | "neutres", passages) ;
+    # le modèle du backend n'est chargé que si une synthèse manque dans le cache
+    summaries = [NO_SUMMARY] * len(items)
+    todo = [k for k, (trends, _, _) in enumerate(items) if has_trends(trends)]
+    if not todo:
+        return summaries
+
+    prompts = [build_summary_prompt(*items[k]) for k in todo]
+    texts = generate_texts(prompts, backend.generate, cache, backend.model_id, backend.generation_kwargs)
+    for k, text in zip(todo, texts):
+        summaries[k] = clean_summary(text)
+    return summaries
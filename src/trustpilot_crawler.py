@@ -0,0 +1,215 @@
+import re
+import json
+import time
+import hashlib
+import random
+import asyncio
+
+import aiohttp
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RATE = 4.0  # pages par seconde, en moyenne
+DEFAULT_BURST = 8
+MAX_RETRIES = 4
+REQUEST_TIMEOUT = 30
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/124.0 Safari/537.36"
+)
+
+NEXT_DATA_RE = re.compile(
+    r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL
+)
+
+
+class TokenBucket:
+    # débit moyen `rate` requêtes/s, avec des rafales d'au plus `capacity` requêtes
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def review_page_url(base_url, domain, page):
+    return f"{base_url.rstrip('/')}/review/{domain}?page={page}"
+
+
+def parse_next_data(html):
+    # JSON embarqué par Next.js : les avis y sont complets, sans rendu du DOM
+    match = NEXT_DATA_RE.search(html)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except json.JSONDecodeError:
+        return None
+
+
+def text_review_id(text):
+    # id stable dérivé du contenu, quand la source n'en fournit pas (rendu Selenium, JSON incomplet)
+    return "TXT_" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:24]
+
+
+def parse_review_page(data):
+    # renvoie (infos de l'entreprise, avis de la page, nombre total de pages)
+    props = data.get("props", {}).get("pageProps", {})
+    unit = props.get("businessUnit") or {}
+    business = {
+        "name": unit.get("displayName", ""),
+        "trust_score": unit.get("trustScore"),
+    }
+    reviews = []
+    for review in props.get("reviews") or []:
+        text = " ".join((review.get("text") or "").split())
+        if not text:
+            continue
+        reviews.append({
+            # id Trustpilot de l'avis : stable d'une collecte à l'autre, contrairement à sa position
+            "review_id": review.get("id") or text_review_id(text),
+            "rating": review.get("rating"),
+            "published": (review.get("dates") or {}).get("publishedDate", ""),
+            "text": text,
+        })
+    pagination = (props.get("filters") or {}).get("pagination") or {}
+    return business, reviews, pagination.get("totalPages")
+
+
+class PageUnavailable(Exception):
+    pass
+
+
+async def fetch_page(session, url, limiter, semaphore):
+    # None si la page n'existe pas (404 : au-delà de la dernière page)
+    for attempt in range(MAX_RETRIES + 1):
+        async with semaphore:
+            await limiter.acquire()
+            try:
+                async with session.get(url) as response:
+                    if response.status == 404:
+                        return None
+                    if response.status == 429 or response.status >= 500:
+                        retry_after = response.headers.get("Retry-After", "")
+                        delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt + random.random()
+                        print(f"DEBUG: {response.status} sur {url}, nouvel essai dans {delay:.1f} s")
+                    elif response.status >= 400:
+                        raise PageUnavailable(f"{url} : HTTP {response.status}")
+                    else:
+                        return await response.text()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                delay = 2 ** attempt + random.random()
+                print(f"DEBUG: {type(e).__name__} sur {url}, nouvel essai dans {delay:.1f} s")
+        if attempt == MAX_RETRIES:
+            break
+        # l'attente se fait hors du sémaphore pour ne pas bloquer les autres pages
+        await asyncio.sleep(delay)
+    raise PageUnavailable(f"{url} : abandon après {MAX_RETRIES + 1} essais")
+
+
+async def crawl_domain(domain, base_url, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE,
+                       max_pages=None, start_page=1, stop_at=None):
+    # renvoie (infos de l'entreprise, [(page, avis de la page)] dans l'ordre des pages,
+    # [pages en échec], raison de l'arrêt) ; None si la page de départ a été servie sans
+    # __NEXT_DATA__ (repli Selenium). Raisons : "end" (dernière page atteinte), "stop" (stop_at),
+    # "max_pages", "failed" (plus aucune page lisible).
+    # Une page en échec (réessais épuisés, JSON absent) n'arrête pas la collecte, contrairement
+    # à une page vide ou inexistante, qui marque la fin des avis.
+    # PageUnavailable si la première page ne peut pas être lue (site injoignable, domaine inconnu).
+    # stop_at(avis) -> True arrête la collecte à cette page (exclue), ex: page d'avis déjà connus
+    limiter = TokenBucket(rate, max(1, min(DEFAULT_BURST, concurrency)))
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+
+    async with aiohttp.ClientSession(
+        connector=connector, timeout=timeout, headers={"User-Agent": USER_AGENT}
+    ) as session:
+        url = review_page_url(base_url, domain, start_page)
+        html = await fetch_page(session, url, limiter, semaphore)
+        if html is None:
+            if start_page == 1:
+                raise PageUnavailable(f"{url} : HTTP 404")
+            # reprise au-delà de la dernière page : il n'y a plus rien à lire
+            return {"name": "", "trust_score": None}, [], [], "end"
+        data = parse_next_data(html)
+        if data is None:
+            return None
+        business, reviews, total_pages = parse_review_page(data)
+        if stop_at is not None and reviews and stop_at(reviews):
+            return business, [], [], "stop"
+        pages = [(start_page, reviews)]
+        failed = []
+        if not reviews:
+            return business, pages, failed, "end"
+
+        last_page = total_pages
+        if max_pages:
+            last_page = min(last_page or start_page + max_pages - 1, start_page + max_pages - 1)
+        # raison de l'arrêt si toutes les pages jusqu'à last_page sont lues
+        last_reason = "end" if total_pages and last_page == total_pages else "max_pages"
+
+        async def fetch_reviews(page):
+            # (page, avis) ; avis vaut None si la page n'a pas pu être lue
+            try:
+                page_html = await fetch_page(session, review_page_url(base_url, domain, page), limiter, semaphore)
+            except PageUnavailable as e:
+                print(f"ERREUR: {e}")
+                return page, None
+            if page_html is None:
+                return page, []
+            page_data = parse_next_data(page_html)
+            if page_data is None:
+                print(f"ERREUR: Page {page} sans __NEXT_DATA__.")
+                return page, None
+            return page, parse_review_page(page_data)[1]
+
+        if last_page and stop_at is None:
+            results = await asyncio.gather(*(fetch_reviews(p) for p in range(start_page + 1, last_page + 1)))
+            pages.extend(result for result in results if result[1] is not None)
+            failed.extend(page for page, page_reviews in results if page_reviews is None)
+            return business, pages, failed, last_reason
+
+        # nombre de pages inconnu, ou arrêt anticipé possible : fenêtres de `concurrency` pages,
+        # jusqu'à la première page vide ou à arrêter
+        page = start_page + 1
+        while not last_page or page <= last_page:
+            end = page + concurrency if not last_page else min(page + concurrency, last_page + 1)
+            window = await asyncio.gather(*(fetch_reviews(p) for p in range(page, end)))
+            if all(page_reviews is None for _, page_reviews in window):
+                # sans aucune page lisible, impossible de savoir où s'arrêter
+                print(f"ERREUR: Aucune page lisible entre {page} et {end - 1}, collecte interrompue.")
+                failed.extend(p for p, _ in window)
+                return business, pages, failed, "failed"
+            for result in window:
+                if result[1] is None:
+                    failed.append(result[0])
+                    continue
+                if not result[1]:
+                    return business, pages, failed, "end"
+                if stop_at is not None and stop_at(result[1]):
+                    return business, pages, failed, "stop"
+                pages.append(result)
+            page = end
+        return business, pages, failed, last_reason
+
+
+def crawl_frontier(start_page, pages, failed, reason):
+    # après une collecte sans trou depuis start_page : (première page à relire la prochaine fois,
+    # historique complet ?). Les nouveaux avis ne font que repousser les anciens vers les pages
+    # suivantes : tout ce qui n'a pas été lu est encore au-delà de cette page.
+    if failed:
+        return min(failed), False
+    last = pages[-1][0] if pages else start_page - 1
+    return last + 1, reason == "end"
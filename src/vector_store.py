@@ -0,0 +1,413 @@
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+
+import numpy as np
+import faiss
+
+from src.config import VECTOR_INDEX_TYPE, VECTOR_INDEX_PARAMS
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_DIR = os.path.join(BASE_DIR, "vector_store")
+DB_FILE = "chunks.sqlite"
+INDEX_FILE = "index_{}.faiss"
+
+
+def chunk_id(text, sentiment, review_id):
+    # identifiant FAISS (int64 positif) dérivé du hash du chunk et de sa provenance
+    key = "\x1f".join((sentiment, str(review_id), text))
+    return int(hashlib.sha256(key.encode("utf-8")).hexdigest()[:15], 16)
+
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+DEFAULT_INDEX_PARAMS = {
+    "flat": {},
+    "ivf_flat": {"nlist": 1024, "nprobe": 16},
+    "ivf_pq": {"nlist": 1024, "m": 64, "nbits": 8, "nprobe": 16},
+    "hnsw": {"M": 32, "ef_construction": 200, "ef_search": 64},
+}
+# FAISS recommande au moins ~39 points d'entraînement par centroïde
+MIN_POINTS_PER_CENTROID = 39
+# une même phrase peut revenir une fois par avis : résultats demandés en plus pour garder
+# top_k textes distincts par requête
+DUPLICATE_OVERFETCH = 4
+
+
+def index_params(index_type, overrides=None):
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Type d'index inconnu : {index_type} (attendu : {', '.join(INDEX_TYPES)})")
+    params = dict(DEFAULT_INDEX_PARAMS[index_type])
+    params.update(overrides or {})
+    return params
+
+
+def normalize(vectors):
+    # vecteurs normalisés + produit scalaire = similarité cosinus
+    vectors = np.array(vectors, dtype=np.float32, copy=True)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def can_build(index_type, params, n_vectors):
+    if index_type in ("ivf_flat", "ivf_pq") and n_vectors < MIN_POINTS_PER_CENTROID:
+        return False
+    if index_type == "ivf_pq" and n_vectors < 2 ** params["nbits"]:
+        return False
+    return True
+
+
+def make_index(index_type, params, vectors):
+    # vectors : embeddings normalisés servant à l'entraînement (IVF, PQ)
+    dim = vectors.shape[1]
+    metric = faiss.METRIC_INNER_PRODUCT
+    if index_type == "flat":
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+    if index_type == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dim, params["M"], metric)
+        hnsw.hnsw.efConstruction = params["ef_construction"]
+        return faiss.IndexIDMap2(hnsw)
+
+    nlist = min(params["nlist"], max(1, len(vectors) // MIN_POINTS_PER_CENTROID))
+    quantizer = faiss.IndexFlatIP(dim)
+    if index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+    else:
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, params["m"], params["nbits"], metric)
+    index.train(vectors)
+    # les index IVF gèrent directement add_with_ids / remove_ids
+    return index
+
+
+def set_search_params(index, index_type, params):
+    if index_type in ("ivf_flat", "ivf_pq"):
+        faiss.extract_index_ivf(index).nprobe = params["nprobe"]
+    elif index_type == "hnsw":
+        faiss.downcast_index(index.index).hnsw.efSearch = params["ef_search"]
+
+
+def _read_index_mmap(path):
+    flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+    try:
+        return faiss.read_index(path, flags)
+    except RuntimeError:
+        # type d'index sans support mmap dans cette version de FAISS : lecture classique
+        return faiss.read_index(path)
+
+
+class VectorStore:
+    # un sous-index FAISS par sentiment : une requête ne parcourt que les chunks de son sentiment
+    # migrate : vide un store à l'ancien format (sans partition par sentiment) au lieu de refuser de l'ouvrir ;
+    # seuls le script de tendances, qui le remplit, et `python -m src.vector_store migrate` le demandent
+    def __init__(self, path=STORE_DIR, encoder_name="", index_type=VECTOR_INDEX_TYPE, params=None, migrate=False):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.encoder_name = encoder_name
+        self.index_type = index_type
+        self.params = index_params(index_type, json.loads(VECTOR_INDEX_PARAMS) if params is None else params)
+        self.indexes = {}
+        self.built_types = {}
+        self._needs_rebuild = set()
+        self.conn = sqlite3.connect(os.path.join(path, DB_FILE))
+        self._create_tables(migrate)
+        self._check_encoder()
+
+    def _create_tables(self, migrate=False):
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(chunks)")}
+        if columns and "sentiment" not in columns:
+            if not migrate:
+                self.conn.close()
+                raise RuntimeError(
+                    f"Vector store à l'ancien format dans {self.path} : lancer `python -m src.vector_store migrate` "
+                    "(ou sentiment_trend_analysis, qui le reconstruit)"
+                )
+            print("DEBUG: Vector store sans partition par sentiment (ancien format), il est vidé.")
+            self.conn.execute("DROP TABLE chunks")
+            self._remove_index_files()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, sentiment TEXT NOT NULL, "
+            "review_id TEXT, domain TEXT, text TEXT NOT NULL, embedding BLOB NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS chunks_sentiment ON chunks (sentiment)")
+        self.conn.commit()
+
+    def _check_encoder(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'encoder'").fetchone()
+        if row is not None and self.encoder_name and row[0] != self.encoder_name:
+            print(f"DEBUG: Encodeur changé ({row[0]} → {self.encoder_name}), le vector store est vidé.")
+            self.conn.execute("DELETE FROM chunks")
+            self._remove_index_files()
+        if self.encoder_name:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('encoder', ?)", (self.encoder_name,))
+        self.conn.commit()
+
+    def index_path(self, sentiment):
+        return os.path.join(self.path, INDEX_FILE.format(sentiment.lower()))
+
+    def _remove_index_files(self):
+        for name in os.listdir(self.path):
+            if name.startswith("index") and name.endswith(".faiss"):
+                os.remove(os.path.join(self.path, name))
+
+    def _get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+        self.conn.commit()
+
+    def _requested_config(self):
+        return json.dumps({"type": self.index_type, "params": self.params}, sort_keys=True)
+
+    def _index_outdated(self, sentiment, n_vectors):
+        if self._get_meta("index_config") != self._requested_config():
+            return True
+        # index de repli (flat) construit faute de vecteurs : on passe au type demandé dès que possible
+        built_type = self._get_meta(f"index_built_type:{sentiment}")
+        return built_type != self.index_type and can_build(self.index_type, self.params, n_vectors)
+
+    def _load_index(self, sentiment, mmap=False):
+        path = self.index_path(sentiment)
+        index = _read_index_mmap(path) if mmap else faiss.read_index(path)
+        built_type = self._get_meta(f"index_built_type:{sentiment}") or "flat"
+        set_search_params(index, built_type, self.params)
+        self.indexes[sentiment] = index
+        self.built_types[sentiment] = built_type
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def counts(self):
+        # nombre de chunks par sentiment
+        return dict(self.conn.execute("SELECT sentiment, COUNT(*) FROM chunks GROUP BY sentiment"))
+
+    def _load_embeddings(self, ids=None, sentiment=None):
+        if ids is None:
+            if sentiment is None:
+                rows = self.conn.execute("SELECT id, embedding FROM chunks ORDER BY id").fetchall()
+            else:
+                rows = self.conn.execute(
+                    "SELECT id, embedding FROM chunks WHERE sentiment = ? ORDER BY id", (sentiment,)
+                ).fetchall()
+        else:
+            rows = []
+            ids = [int(i) for i in ids]
+            for start in range(0, len(ids), 500):
+                part = ids[start:start + 500]
+                placeholders = ",".join("?" * len(part))
+                rows.extend(self.conn.execute(
+                    f"SELECT id, embedding FROM chunks WHERE id IN ({placeholders})", part
+                ))
+        found = {row_id: np.frombuffer(blob, dtype=np.float32) for row_id, blob in rows}
+        return found
+
+    def sync(self, chunks, encoder):
+        # chunks : dicts {"text", "sentiment", "review_id", "domain"}
+        current = {}
+        for chunk in chunks:
+            current.setdefault(chunk_id(chunk["text"], chunk["sentiment"], chunk["review_id"]), chunk)
+
+        stored = dict(self.conn.execute("SELECT id, sentiment FROM chunks"))
+        new_ids = [i for i in current if i not in stored]
+        removed_ids = [i for i in stored if i not in current]
+        changed = {current[i]["sentiment"] for i in new_ids} | {stored[i] for i in removed_ids}
+
+        sizes = {}
+        for chunk in current.values():
+            sizes[chunk["sentiment"]] = sizes.get(chunk["sentiment"], 0) + 1
+        stored_sizes = self.counts()
+
+        self.indexes, self.built_types, self._needs_rebuild = {}, {}, set()
+        for sentiment in set(sizes) | set(stored_sizes):
+            index_ok = (
+                os.path.exists(self.index_path(sentiment))
+                and not self._index_outdated(sentiment, sizes.get(sentiment, 0))
+            )
+            if not index_ok:
+                self._needs_rebuild.add(sentiment)
+            elif sentiment in changed:
+                self._load_index(sentiment)
+            else:
+                self._load_index(sentiment, mmap=True)
+                if self.indexes[sentiment].ntotal != stored_sizes.get(sentiment, 0):
+                    # index écrit partiellement (run interrompu) : on le reconstruit depuis la base
+                    print(f"DEBUG: Index FAISS {sentiment} désynchronisé de la base, reconstruction.")
+                    self._needs_rebuild.add(sentiment)
+
+        if not new_ids and not removed_ids and not self._needs_rebuild:
+            print(f"DEBUG: Vector store à jour ({len(stored)} chunks), index chargés en mmap.")
+            return
+
+        print(f"DEBUG: Vector store : {len(new_ids)} chunks à encoder, {len(removed_ids)} à supprimer.")
+        if removed_ids:
+            self.delete(removed_ids)
+
+        if new_ids:
+            new_chunks = [current[i] for i in new_ids]
+            embeddings = np.asarray(
+                encoder.encode([c["text"] for c in new_chunks], convert_to_tensor=False), dtype=np.float32
+            )
+            for sentiment in {c["sentiment"] for c in new_chunks}:
+                index = self.indexes.get(sentiment)
+                if index is None or sentiment in self._needs_rebuild:
+                    continue
+                rows = [k for k, c in enumerate(new_chunks) if c["sentiment"] == sentiment]
+                index.add_with_ids(normalize(embeddings[rows]), np.array([new_ids[k] for k in rows], dtype=np.int64))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, sentiment, review_id, domain, text, embedding) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (i, c["sentiment"], c["review_id"], c["domain"], c["text"], emb.tobytes())
+                    for i, c, emb in zip(new_ids, new_chunks, embeddings)
+                ]
+            )
+            self.conn.commit()
+
+        for sentiment in changed | self._needs_rebuild:
+            if sentiment in self._needs_rebuild or sentiment not in self.indexes or sentiment not in sizes:
+                self._rebuild_partition(sentiment)
+            else:
+                faiss.write_index(self.indexes[sentiment], self.index_path(sentiment))
+        self._needs_rebuild = set()
+
+    def delete(self, ids):
+        ids = [int(i) for i in ids]
+        by_sentiment = {}
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            for row_id, sentiment in self.conn.execute(
+                f"SELECT id, sentiment FROM chunks WHERE id IN ({placeholders})", part
+            ):
+                by_sentiment.setdefault(sentiment, []).append(row_id)
+
+        for sentiment, sentiment_ids in by_sentiment.items():
+            index = self.indexes.get(sentiment)
+            if index is None:
+                continue
+            if self.built_types[sentiment] == "hnsw":
+                # HNSW ne sait pas retirer de vecteurs : reconstruction depuis la base après suppression
+                self._needs_rebuild.add(sentiment)
+            else:
+                index.remove_ids(faiss.IDSelectorBatch(np.array(sentiment_ids, dtype=np.int64)))
+        self.conn.executemany("DELETE FROM chunks WHERE id = ?", [(i,) for i in ids])
+        self.conn.commit()
+
+    def _rebuild_partition(self, sentiment):
+        path = self.index_path(sentiment)
+        found = self._load_embeddings(sentiment=sentiment)
+        if not found:
+            self.indexes.pop(sentiment, None)
+            self.built_types.pop(sentiment, None)
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        ids = np.array(list(found), dtype=np.int64)
+        embeddings = normalize(np.vstack(list(found.values())))
+
+        built_type = self.index_type
+        if not can_build(self.index_type, self.params, len(embeddings)):
+            print(
+                f"DEBUG: Trop peu de vecteurs {sentiment} ({len(embeddings)}) "
+                f"pour un index {self.index_type}, repli sur flat."
+            )
+            built_type = "flat"
+
+        index = make_index(built_type, self.params, embeddings)
+        index.add_with_ids(embeddings, ids)
+        set_search_params(index, built_type, self.params)
+        faiss.write_index(index, path)
+        self.indexes[sentiment] = index
+        self.built_types[sentiment] = built_type
+        self._set_meta(f"index_built_type:{sentiment}", built_type)
+        self._set_meta("index_config", self._requested_config())
+
+    def rebuild(self):
+        # compaction / réentraînement : index recréés à partir des embeddings stockés, sans réencoder
+        self._needs_rebuild = set()
+        self._remove_index_files()
+        self.indexes, self.built_types = {}, {}
+        for sentiment in self.counts():
+            self._rebuild_partition(sentiment)
+        self.conn.execute("VACUUM")
+
+    def search(self, query_embeddings, top_k, sentiment):
+        # renvoie (similarités cosinus, ids) parmi les chunks du sentiment demandé
+        query_embeddings = normalize(query_embeddings)
+        index = self.indexes.get(sentiment)
+        if index is None or index.ntotal == 0:
+            return np.empty((len(query_embeddings), 0)), np.full((len(query_embeddings), 0), -1)
+        return index.search(query_embeddings, min(top_k, index.ntotal))
+
+    def search_distinct(self, query_embeddings, top_k, sentiment, overfetch=DUPLICATE_OVERFETCH):
+        # {id: meilleure similarité}, au plus top_k textes distincts par requête et un seul id par texte :
+        # une phrase présente dans plusieurs avis garde un chunk (et un id) par avis pour la provenance,
+        # mais ne compte qu'une fois comme passage
+        similarities, ids = self.search(query_embeddings, top_k * overfetch, sentiment)
+        texts = self._texts_by_id(ids.ravel().tolist())
+        best_id = {}
+        relevance = {}
+        for row_similarities, row_ids in zip(similarities.tolist(), ids.tolist()):
+            seen = set()
+            for sim, idx in zip(row_similarities, row_ids):
+                if idx == -1 or idx not in texts or texts[idx] in seen:
+                    continue
+                seen.add(texts[idx])
+                representative = best_id.setdefault(texts[idx], idx)
+                relevance[representative] = max(sim, relevance.get(representative, -1.0))
+                if len(seen) == top_k:
+                    break
+        return relevance
+
+    def embeddings(self, ids):
+        # embeddings normalisés, dans l'ordre des ids demandés
+        found = self._load_embeddings(ids)
+        return normalize(np.vstack([found[int(i)] for i in ids]))
+
+    def _texts_by_id(self, ids):
+        ids = sorted({int(i) for i in ids if i != -1})
+        found = {}
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            found.update(self.conn.execute(f"SELECT id, text FROM chunks WHERE id IN ({placeholders})", part))
+        return found
+
+    def texts(self, ids):
+        found = self._texts_by_id(ids)
+        return [found[int(i)] for i in ids if i != -1 and int(i) in found]
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("stats", "rebuild", "migrate"):
+        print("Usage: python -m src.vector_store <stats|rebuild|migrate>")
+        print("  rebuild : recrée l'index FAISS depuis les embeddings stockés (compaction)")
+        print("  migrate : vide un store à l'ancien format, il sera rempli au prochain lancement des tendances")
+        sys.exit(1)
+
+    store = VectorStore(migrate=(sys.argv[1] == "migrate"))
+    if sys.argv[1] == "migrate":
+        print(f"✅ Vector store au format courant dans {store.path} ({len(store)} chunks)")
+    elif sys.argv[1] == "stats":
+        print(f"{len(store)} chunks stockés, index demandé : {store._requested_config()}")
+        for sentiment, count in sorted(store.counts().items()):
+            path = store.index_path(sentiment)
+            ntotal = faiss.read_index(path).ntotal if os.path.exists(path) else 0
+            built_type = store._get_meta(f"index_built_type:{sentiment}")
+            print(f"  {sentiment:<9} {count} chunks, {ntotal} vecteurs ({built_type}) dans {path}")
+        for domain, count in store.conn.execute("SELECT domain, COUNT(*) FROM chunks GROUP BY domain ORDER BY 2 DESC"):
+            print(f"  domaine {domain} : {count} chunks")
+    else:
+        store.rebuild()
+        print(f"✅ Index reconstruits : {len(store)} vecteurs dans {store.path}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import time
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import InvalidSessionIdException, NoSuchWindowException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from urllib3.exceptions import HTTPError as DriverConnectionError
+
+# ressources inutiles pour lire le texte des avis : bloquées au niveau réseau
+BLOCKED_URL_PATTERNS = [
+    "*.css", "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+]
+# messages de chromedriver quand le navigateur a planté ou ne répond plus
+SESSION_LOST_MESSAGES = ("chrome not reachable", "disconnected", "tab crashed", "session deleted")
+
+
+def make_headless_chrome():
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    # "eager" : get() rend la main dès le DOM prêt, sans attendre images et feuilles de style
+    options.page_load_strategy = "eager"
+    options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    driver = webdriver.Chrome(options=options)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    return driver
+
+
+def is_session_lost(error):
+    # seule une session perdue justifie de relancer le navigateur ; une erreur propre à la page
+    # (délai de chargement dépassé, élément absent) le laisse utilisable pour la suivante
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException)):
+        return True
+    if isinstance(error, (ConnectionError, DriverConnectionError)):
+        # chromedriver injoignable
+        return True
+    if isinstance(error, WebDriverException):
+        message = (error.msg or "").lower()
+        return any(marker in message for marker in SESSION_LOST_MESSAGES)
+    return False
+
+
+class WebDriverPool:
+    # navigateurs démarrés une fois et réutilisés d'une page à l'autre
+    def __init__(self, size, factory=make_headless_chrome):
+        self.size = size
+        self.factory = factory
+        self.drivers = []
+        self.idle = queue.Queue()
+        self.busy_seconds = 0.0
+        self.uses = 0
+        self.replaced = 0
+        self.lock = threading.Lock()
+        self.started_at = None
+
+    def start(self):
+        start = time.perf_counter()
+        try:
+            for _ in range(self.size):
+                driver = self.factory()
+                self.drivers.append(driver)
+                self.idle.put(driver)
+        except Exception:
+            # __exit__ n'est pas appelé si __enter__ échoue : les navigateurs déjà lancés sont fermés ici
+            self.close()
+            raise
+        print(f"DEBUG: {self.size} navigateurs démarrés en {time.perf_counter() - start:.2f} s")
+        self.started_at = time.perf_counter()
+        return self
+
+    @contextmanager
+    def driver(self):
+        driver = self.idle.get()
+        start = time.perf_counter()
+        try:
+            yield driver
+        except Exception as e:
+            if is_session_lost(e):
+                # navigateur planté ou session perdue : remplacé plutôt que rendu tel quel au pool
+                driver = self._replace(driver)
+            raise
+        finally:
+            with self.lock:
+                self.busy_seconds += time.perf_counter() - start
+                self.uses += 1
+            self.idle.put(driver)
+
+    def _replace(self, driver):
+        # le remplaçant est démarré avant de fermer l'ancien : si le démarrage échoue, l'ancien
+        # reste dans le pool (la session peut encore répondre) pour ne pas bloquer les autres
+        # threads, et il sera de nouveau remplacé à sa prochaine erreur
+        try:
+            replacement = self.factory()
+        except Exception as e:
+            print(f"Erreur au redémarrage d'un navigateur : {e}")
+            return driver
+        with self.lock:
+            self.drivers[self.drivers.index(driver)] = replacement
+            self.replaced += 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        print("DEBUG: Navigateur en erreur remplacé")
+        return replacement
+
+    def utilization(self):
+        # part du temps où les navigateurs du pool étaient occupés depuis le démarrage
+        if self.started_at is None:
+            return 0.0
+        elapsed = time.perf_counter() - self.started_at
+        return self.busy_seconds / (elapsed * self.size) if elapsed > 0 else 0.0
+
+    def close(self):
+        for driver in self.drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                print(f"Erreur à la fermeture d'un navigateur : {e}")
+        self.drivers = []
+        self.idle = queue.Queue()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
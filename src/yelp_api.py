@@ -1,33 +1,181 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from email.utils import parsedate_to_datetime
+
 import requests
+from requests.adapters import HTTPAdapter
+
 from src.config import YELP_API_KEY, BASE_YELP_URL
 
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_FILE = os.path.join(BASE_DIR, "yelp_cache.sqlite")
+
+DEFAULT_CACHE_TTL = 24 * 3600
+# l'API renvoie au plus 50 résultats par page, et offset + limit ne peut dépasser 240
+SEARCH_PAGE_SIZE = 50
+SEARCH_MAX_RESULTS = 240
+MAX_RETRIES = 5
+MAX_BACKOFF = 60
+DEFAULT_WORKERS = 8
+
+
+class ResponseCache:
+    # réponses JSON de l'API, indexées par serveur + endpoint + paramètres, valables `ttl` secondes
+    def __init__(self, path=CACHE_FILE, ttl=DEFAULT_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, body TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(base_url, path, params):
+        # le serveur fait partie de la clé : un serveur de test (BASE_YELP_URL) ne lit pas les réponses de l'API
+        payload = json.dumps({"base_url": base_url, "path": path, "params": params or {}}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT body, fetched_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or time.time() - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key, body):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, fetched_at) VALUES (?, ?, ?)",
+                (key, json.dumps(body), time.time())
+            )
+            self.conn.commit()
+
+    def purge(self):
+        with self.lock:
+            cur = self.conn.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - self.ttl,))
+            self.conn.commit()
+            return cur.rowcount
+
+    def close(self):
+        self.conn.close()
+
+
+def retry_delay(response, attempt):
+    # Retry-After (secondes ou date HTTP) si l'API le fournit, sinon backoff exponentiel avec jitter
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        if retry_after.strip().isdigit():
+            return min(float(retry_after), MAX_BACKOFF)
+        try:
+            return min(max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()), MAX_BACKOFF)
+        except (TypeError, ValueError):
+            pass
+    return min(2 ** attempt + random.random(), MAX_BACKOFF)
+
+
+class YelpClient:
+    def __init__(self, api_key=YELP_API_KEY, base_url=BASE_YELP_URL, cache=None, pool_size=DEFAULT_WORKERS):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        # une seule session : connexions TCP/TLS réutilisées entre les appels et entre les threads
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {api_key}"
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, path, params=None):
+        # None si la ressource n'existe pas (404)
+        key = ResponseCache.make_key(self.base_url, path, params) if self.cache is not None else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        url = f"{self.base_url}{path}"
+        for attempt in range(MAX_RETRIES + 1):
+            response = None
+            try:
+                response = self.session.get(url, params=params, timeout=30)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                print(f"[WARNING] {type(e).__name__} sur {path}")
+            if response is not None:
+                if response.status_code == 404:
+                    return None
+                if response.status_code != 429 and response.status_code < 500:
+                    response.raise_for_status()
+                    body = response.json()
+                    if response.headers.get("RateLimit-Remaining") == "0":
+                        print("[WARNING] Quota quotidien de l'API Yelp épuisé.")
+                    if key is not None:
+                        self.cache.put(key, body)
+                    return body
+            if attempt == MAX_RETRIES:
+                break
+            delay = retry_delay(response, attempt)
+            status = response.status_code if response is not None else "erreur réseau"
+            print(f"[WARNING] {status} sur {path}, nouvel essai dans {delay:.1f} s")
+            time.sleep(delay)
+        if response is not None:
+            response.raise_for_status()
+        raise requests.ConnectionError(f"{url} injoignable après {MAX_RETRIES + 1} essais")
+
+    def search_businesses(self, term="restaurants", location="Paris", total=10):
+        # pagination par offset jusqu'à `total` résultats (ou la fin des résultats)
+        total = min(total, SEARCH_MAX_RESULTS)
+        businesses = []
+        offset = 0
+        while offset < total:
+            limit = min(SEARCH_PAGE_SIZE, total - offset)
+            data = self.get("/businesses/search", {
+                "term": term, "location": location, "limit": limit, "offset": offset
+            }) or {}
+            page = data.get("businesses", [])
+            businesses.extend(page)
+            offset += limit
+            if len(page) < limit or offset >= data.get("total", total):
+                break
+        return businesses
+
+    def reviews(self, business_id):
+        data = self.get(f"/businesses/{business_id}/reviews")
+        if data is None:
+            print(f"[WARNING] 404 Not Found for ID: {business_id}. Skipping reviews.")
+            return []
+        return data.get("reviews", [])
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            cache = ResponseCache()
+            # les réponses expirées ne seront plus jamais lues : retirées une fois par processus
+            cache.purge()
+            _client = YelpClient(cache=cache)
+        return _client
+
+
 def get_restaurants_by_location(term="restaurants", location="Paris", limit=10):
-    headers = {
-        "Authorization": f"Bearer {YELP_API_KEY}"
-    }
-    params = {
-        "term": term,
-        "location": location,
-        "limit": limit
-    }
-    url = f"{BASE_YELP_URL}/businesses/search"
-    response = requests.get(url, headers=headers, params=params)
-    response.raise_for_status()
-    data = response.json()
-    return data.get("businesses", [])
+    return get_client().search_businesses(term=term, location=location, total=limit)
 
 def get_reviews(business_id):
-    headers = {
-        "Authorization": f"Bearer {YELP_API_KEY}"
-    }
-    url = f"{BASE_YELP_URL}/businesses/{business_id}/reviews"
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 404:
-        print(f"[WARNING] 404 Not Found for ID: {business_id}. Skipping reviews.")
-        return []
-
-    response.raise_for_status()
-    
-    data = response.json()
-    return data.get("reviews", [])
\ No newline at end of file
+    return get_client().reviews(business_id)
@@ -0,0 +1,171 @@
+import os
+import json
+import asyncio
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from src.crawl_state import CrawlState
+from src.scrape_trustpilot import scrape_with_http
+from src.trustpilot_crawler import crawl_domain, crawl_frontier, PageUnavailable
+
+DOMAIN = "exemple.fr"
+REVIEWS_PER_PAGE = 3
+
+
+def review_page(page, total_pages):
+    reviews = [
+        {"id": f"r{page}-{i}", "rating": 4, "text": f"Avis {i} de la page {page}",
+         "dates": {"publishedDate": "2024-01-01T00:00:00Z"}}
+        for i in range(REVIEWS_PER_PAGE)
+    ]
+    data = {"props": {"pageProps": {
+        "businessUnit": {"displayName": "Exemple", "trustScore": 4.2},
+        "reviews": reviews,
+        "filters": {"pagination": {"totalPages": total_pages}},
+    }}}
+    return f'<html><script id="__NEXT_DATA__" type="application/json">{json.dumps(data)}</script></html>'
+
+
+class FixtureSite:
+    # pages 1..pages d'avis ; `broken` : pages toujours en 503 ; `plain` : pages servies sans JSON ;
+    # `announce_total` : totalPages renseigné ou non (parcours par fenêtres)
+    def __init__(self, pages, broken=(), plain=(), announce_total=True):
+        self.pages = pages
+        self.broken = set(broken)
+        self.plain = set(plain)
+        self.announce_total = announce_total
+
+    def respond(self, path):
+        url = urlparse(path)
+        if url.path != f"/review/{DOMAIN}":
+            return 404, ""
+        page = int(parse_qs(url.query)["page"][0])
+        if page in self.broken:
+            return 503, ""
+        if page > self.pages:
+            return 404, ""
+        if page in self.plain:
+            return 200, "<html><body>pas de JSON</body></html>"
+        return 200, review_page(page, self.pages if self.announce_total else None)
+
+
+class FixtureServerTest(unittest.TestCase):
+    def serve(self, site):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body = site.respond(self.path)
+                data = body.encode("utf-8")
+                self.send_response(status)
+                # réessais immédiats : le test ne dépend pas des délais de repli
+                self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    def crawl(self, site, **kwargs):
+        return asyncio.run(crawl_domain(DOMAIN, self.serve(site), concurrency=2, rate=1000, **kwargs))
+
+
+class CrawlerTest(FixtureServerTest):
+    def test_known_page_count(self):
+        business, pages, failed, reason = self.crawl(FixtureSite(5, broken=[3]))
+        self.assertEqual(business["name"], "Exemple")
+        self.assertEqual([page for page, _ in pages], [1, 2, 4, 5])
+        self.assertEqual(failed, [3])
+        self.assertEqual(reason, "end")
+        self.assertEqual(pages[0][1][0]["review_id"], "r1-0")
+        self.assertEqual(crawl_frontier(1, pages, failed, reason), (3, False))
+
+    def test_failed_page_does_not_end_windowed_crawl(self):
+        site = FixtureSite(6, broken=[3], plain=[4], announce_total=False)
+        _, pages, failed, reason = self.crawl(site)
+        self.assertEqual([page for page, _ in pages], [1, 2, 5, 6])
+        self.assertEqual(sorted(failed), [3, 4])
+        self.assertEqual(reason, "end")
+
+    def test_stop_at_known_page(self):
+        site = FixtureSite(6)
+        _, pages, failed, reason = self.crawl(site, stop_at=lambda reviews: reviews[0]["review_id"] == "r3-0")
+        self.assertEqual([page for page, _ in pages], [1, 2])
+        self.assertEqual(failed, [])
+        self.assertEqual(reason, "stop")
+
+    def test_max_pages(self):
+        _, pages, failed, reason = self.crawl(FixtureSite(6), max_pages=2)
+        self.assertEqual([page for page, _ in pages], [1, 2])
+        self.assertEqual(reason, "max_pages")
+        self.assertEqual(crawl_frontier(1, pages, failed, reason), (3, False))
+
+    def test_resume_beyond_last_page(self):
+        _, pages, failed, reason = self.crawl(FixtureSite(3), start_page=4)
+        self.assertEqual((pages, failed, reason), ([], [], "end"))
+        self.assertEqual(crawl_frontier(4, pages, failed, reason), (4, True))
+
+    def test_missing_domain_raises(self):
+        with self.assertRaises(PageUnavailable):
+            self.crawl(FixtureSite(0))
+
+    def test_unreachable_first_page_raises(self):
+        with self.assertRaises(PageUnavailable):
+            self.crawl(FixtureSite(3, broken=[1]))
+
+    def test_first_page_without_next_data(self):
+        self.assertIsNone(self.crawl(FixtureSite(3, plain=[1])))
+
+
+class ResumeTest(FixtureServerTest):
+    # collectes successives limitées par --max-pages : chacune reprend là où la précédente s'est arrêtée
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.state = CrawlState(os.path.join(directory.name, "crawl_state.sqlite"))
+        self.addCleanup(self.state.close)
+        self.written = []
+        patcher = mock.patch("src.scrape_trustpilot.append_reviews", side_effect=self.written.extend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def scrape(self, base_url, max_pages):
+        incremental = self.state.has_crawled(DOMAIN)
+        result = scrape_with_http(DOMAIN, base_url, 2, 1000, max_pages, self.state, incremental)
+        self.state.record_crawl(DOMAIN, 0, "incremental" if incremental else "full", result[1], result[0])
+        return result
+
+    def test_history_resumes_until_complete(self):
+        base_url = self.serve(FixtureSite(5))
+        self.assertEqual(self.scrape(base_url, 2), (6, 2))
+        self.assertEqual(self.state.backfill(DOMAIN), (3, False))
+        self.assertEqual(self.scrape(base_url, 2), (6, 2))
+        self.assertEqual(self.state.backfill(DOMAIN), (5, False))
+        self.assertEqual(self.scrape(base_url, 2), (3, 1))
+        self.assertEqual(self.state.backfill(DOMAIN), (6, True))
+        # historique complet : seule la première page est relue
+        self.assertEqual(self.scrape(base_url, 2), (0, 0))
+        self.assertEqual(len({r["review_id"] for r in self.written}), 5 * REVIEWS_PER_PAGE)
+        self.assertEqual(len(self.written), 5 * REVIEWS_PER_PAGE)
+
+    def test_failed_page_is_read_again(self):
+        site = FixtureSite(3, broken=[2])
+        base_url = self.serve(site)
+        self.assertEqual(self.scrape(base_url, None), (6, 2))
+        self.assertEqual(self.state.backfill(DOMAIN), (2, False))
+        site.broken.clear()
+        self.assertEqual(self.scrape(base_url, None), (3, 2))
+        self.assertEqual(self.state.backfill(DOMAIN), (4, True))
+
+
+if __name__ == "__main__":
+    unittest.main()
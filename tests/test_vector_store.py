@@ -0,0 +1,80 @@
+import zlib
+import tempfile
+import unittest
+import importlib.util
+
+import numpy as np
+
+from src.vector_store import VectorStore
+
+DIM = 64
+SHARED = "livraison rapide et colis bien emballé"
+OTHERS = [
+    "livraison en retard de deux jours",
+    "colis abîmé à la réception",
+    "service client rapide et aimable",
+    "remboursement obtenu sans difficulté",
+    "prix corrects pour la qualité",
+]
+
+
+class BagOfWordsEncoder:
+    # encodeur déterministe sans modèle : un mot = une dimension (par hash), textes proches = vecteurs proches
+    def encode(self, sentences, convert_to_tensor=False, **kwargs):
+        single = isinstance(sentences, str)
+        vectors = np.zeros((1 if single else len(sentences), DIM), dtype=np.float32)
+        for row, text in enumerate([sentences] if single else sentences):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode("utf-8")) % DIM] += 1.0
+        return vectors[0] if single else vectors
+
+
+def review_chunks():
+    # la même phrase dans six avis, puis des phrases propres à un avis
+    chunks = [{"text": SHARED, "sentiment": "POSITIVE", "review_id": f"dup-{i}", "domain": "exemple.fr"}
+              for i in range(6)]
+    chunks += [{"text": text, "sentiment": "POSITIVE", "review_id": f"r{i}", "domain": "exemple.fr"}
+               for i, text in enumerate(OTHERS)]
+    return chunks
+
+
+class DuplicatePassagesTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.encoder = BagOfWordsEncoder()
+        self.store = VectorStore(directory.name, encoder_name="bow", index_type="flat", params={})
+        self.addCleanup(self.store.close)
+        self.store.sync(review_chunks(), self.encoder)
+
+    def test_provenance_kept(self):
+        # un chunk par avis : la provenance n'est pas perdue
+        self.assertEqual(self.store.counts()["POSITIVE"], 6 + len(OTHERS))
+
+    def test_search_distinct_counts_a_sentence_once(self):
+        queries = self.encoder.encode(["livraison rapide", "colis emballé"])
+        relevance = self.store.search_distinct(queries, 3, "POSITIVE")
+        texts = self.store.texts(list(relevance))
+        self.assertEqual(len(texts), len(set(texts)))
+        self.assertIn(SHARED, texts)
+        # trois textes distincts par requête malgré les six copies en tête des résultats
+        self.assertGreaterEqual(len(texts), 3)
+
+    @unittest.skipUnless(importlib.util.find_spec("spacy"), "sentiment_trend_analysis demande spaCy")
+    def test_context_passages_are_distinct(self):
+        from src import model_registry
+        from src.sentiment_trend_analysis import retrieve_passages_for_trends, _load_encoder
+
+        model_registry.register_model("encoder", lambda: self.encoder)
+        model_registry.unload_model("encoder")
+        self.addCleanup(model_registry.register_model, "encoder", _load_encoder)
+        self.addCleanup(model_registry.unload_model, "encoder")
+        passages = retrieve_passages_for_trends(
+            {"POSITIVE": ["livraison rapide", "colis emballé", "service rapide"]}, self.store
+        )["POSITIVE"]
+        self.assertEqual(passages.count(SHARED), 1)
+        self.assertEqual(len(passages), len(set(passages)))
+
+
+if __name__ == "__main__":
+    unittest.main()
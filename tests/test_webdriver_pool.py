@@ -0,0 +1,115 @@
+import unittest
+
+try:
+    from selenium.common.exceptions import InvalidSessionIdException, TimeoutException, WebDriverException
+except ImportError:
+    raise unittest.SkipTest("selenium n'est pas installé")
+
+from src.scrape import scrape_business
+from src.webdriver_pool import WebDriverPool, is_session_lost
+
+
+class FakeElement:
+    def __init__(self, text):
+        self.text = text
+
+    def find_element(self, by, xpath):
+        # note et date de l'avis
+        return self
+
+    def get_attribute(self, name):
+        return "4 star rating"
+
+
+class FakeDriver:
+    # navigateur factice : `crash_on` / `timeout_on` : alias dont la page perd la session / dépasse le délai
+    def __init__(self, number, crash_on=(), timeout_on=()):
+        self.number = number
+        self.crash_on = crash_on
+        self.timeout_on = timeout_on
+        self.pages = []
+        self.quit_called = False
+
+    def get(self, url):
+        if self.quit_called:
+            raise InvalidSessionIdException("invalid session id")
+        alias = url.rsplit("/", 1)[-1]
+        if alias in self.crash_on:
+            raise InvalidSessionIdException("invalid session id")
+        if alias in self.timeout_on:
+            raise TimeoutException("timeout: page load")
+        self.pages.append(alias)
+
+    def find_elements(self, by, xpath):
+        return [FakeElement(f"Avis sur {self.pages[-1]}")]
+
+    def quit(self):
+        self.quit_called = True
+
+
+class DriverFactory:
+    def __init__(self, fail_after=None, **driver_options):
+        self.fail_after = fail_after
+        self.driver_options = driver_options
+        self.drivers = []
+
+    def __call__(self):
+        if self.fail_after is not None and len(self.drivers) >= self.fail_after:
+            raise WebDriverException("chromedriver introuvable")
+        driver = FakeDriver(len(self.drivers), **self.driver_options)
+        self.drivers.append(driver)
+        return driver
+
+
+class WebDriverPoolTest(unittest.TestCase):
+    def pool(self, factory, size=1):
+        pool = WebDriverPool(size, factory).start()
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_failed_start_quits_started_drivers(self):
+        factory = DriverFactory(fail_after=2)
+        with self.assertRaises(WebDriverException):
+            WebDriverPool(3, factory).start()
+        self.assertTrue(all(driver.quit_called for driver in factory.drivers))
+
+    def test_page_error_keeps_driver(self):
+        factory = DriverFactory(timeout_on=["lent"])
+        pool = self.pool(factory)
+        reviews, _ = scrape_business(pool, "lent", 5, "http://127.0.0.1")
+        self.assertEqual(reviews, [])
+        reviews, _ = scrape_business(pool, "rapide", 5, "http://127.0.0.1")
+        self.assertEqual([r["text"] for r in reviews], ["Avis sur rapide"])
+        self.assertEqual((len(factory.drivers), pool.replaced), (1, 0))
+
+    def test_lost_session_replaces_driver(self):
+        factory = DriverFactory(crash_on=["plante"])
+        pool = self.pool(factory)
+        reviews, _ = scrape_business(pool, "plante", 5, "http://127.0.0.1")
+        self.assertEqual(reviews, [])
+        self.assertEqual((len(factory.drivers), pool.replaced), (2, 1))
+        self.assertTrue(factory.drivers[0].quit_called)
+        reviews, _ = scrape_business(pool, "suivant", 5, "http://127.0.0.1")
+        self.assertEqual([r["text"] for r in reviews], ["Avis sur suivant"])
+        self.assertEqual(factory.drivers[1].pages, ["suivant"])
+        self.assertEqual(pool.drivers, [factory.drivers[1]])
+
+    def test_failed_replacement_keeps_old_driver_open(self):
+        factory = DriverFactory(fail_after=1, crash_on=["plante"])
+        pool = self.pool(factory)
+        scrape_business(pool, "plante", 5, "http://127.0.0.1")
+        self.assertEqual(pool.replaced, 0)
+        self.assertFalse(factory.drivers[0].quit_called)
+        reviews, _ = scrape_business(pool, "suivant", 5, "http://127.0.0.1")
+        self.assertEqual([r["text"] for r in reviews], ["Avis sur suivant"])
+
+    def test_session_lost_errors(self):
+        self.assertTrue(is_session_lost(InvalidSessionIdException("invalid session id")))
+        self.assertTrue(is_session_lost(WebDriverException("unknown error: chrome not reachable")))
+        self.assertTrue(is_session_lost(ConnectionRefusedError()))
+        self.assertFalse(is_session_lost(TimeoutException("timeout: page load")))
+        self.assertFalse(is_session_lost(ValueError()))
+
+
+if __name__ == "__main__":
+    unittest.main()
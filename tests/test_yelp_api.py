@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from src.yelp_api import YelpClient, ResponseCache, retry_delay, MAX_BACKOFF
+
+
+class FakeYelp:
+    # API Yelp minimale : recherche paginée sur `total` restaurants, avis par restaurant ;
+    # `throttled` : nombre de réponses 429 renvoyées avant de servir normalement
+    def __init__(self, total, throttled=0):
+        self.total = total
+        self.throttled = throttled
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def respond(self, path):
+        url = urlparse(path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        with self.lock:
+            self.requests.append((url.path, params))
+            if self.throttled:
+                self.throttled -= 1
+                return 429, {"error": {"code": "TOO_MANY_REQUESTS_PER_SECOND"}}
+        if url.path == "/businesses/search":
+            offset, limit = int(params["offset"]), int(params["limit"])
+            businesses = [{"id": f"b{i}", "alias": f"resto-{i}"} for i in range(offset, min(offset + limit, self.total))]
+            return 200, {"businesses": businesses, "total": self.total}
+        if url.path == "/businesses/b0/reviews":
+            return 200, {"reviews": [{"text": "Très bon accueil", "rating": 5}]}
+        return 404, {"error": {"code": "BUSINESS_NOT_FOUND"}}
+
+    def offsets(self):
+        return [(int(p["offset"]), int(p["limit"])) for path, p in self.requests if path == "/businesses/search"]
+
+
+class YelpClientTest(unittest.TestCase):
+    def serve(self, api):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body = api.respond(self.path)
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                # réessais immédiats : le test ne dépend pas des délais de repli
+                self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    def client(self, base_url, cache=None):
+        client = YelpClient(api_key="test", base_url=base_url, cache=cache)
+        self.addCleanup(client.close)
+        return client
+
+    def temp_cache(self, ttl=3600):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = ResponseCache(os.path.join(directory.name, "yelp_cache.sqlite"), ttl=ttl)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_search_pages_by_offset(self):
+        api = FakeYelp(total=200)
+        businesses = self.client(self.serve(api)).search_businesses(total=120)
+        self.assertEqual(api.offsets(), [(0, 50), (50, 50), (100, 20)])
+        self.assertEqual([b["id"] for b in businesses], [f"b{i}" for i in range(120)])
+
+    def test_search_stops_at_end_of_results(self):
+        api = FakeYelp(total=70)
+        businesses = self.client(self.serve(api)).search_businesses(total=240)
+        self.assertEqual(api.offsets(), [(0, 50), (50, 50)])
+        self.assertEqual(len(businesses), 70)
+
+    def test_search_capped_by_api_limit(self):
+        api = FakeYelp(total=1000)
+        businesses = self.client(self.serve(api)).search_businesses(total=500)
+        self.assertEqual(api.offsets()[-1], (200, 40))
+        self.assertEqual(len(businesses), 240)
+
+    def test_retry_after_429(self):
+        api = FakeYelp(total=10, throttled=1)
+        reviews = self.client(self.serve(api)).reviews("b0")
+        self.assertEqual(reviews, [{"text": "Très bon accueil", "rating": 5}])
+        self.assertEqual(len(api.requests), 2)
+
+    def test_missing_business(self):
+        api = FakeYelp(total=10)
+        self.assertEqual(self.client(self.serve(api)).reviews("inconnu"), [])
+
+    def test_second_call_served_from_cache(self):
+        api = FakeYelp(total=10)
+        cache = self.temp_cache()
+        base_url = self.serve(api)
+        first = self.client(base_url, cache).reviews("b0")
+        second = self.client(base_url, cache).reviews("b0")
+        self.assertEqual(first, second)
+        self.assertEqual(len(api.requests), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_cache_key_depends_on_server(self):
+        cache = self.temp_cache()
+        first_api, second_api = FakeYelp(total=10), FakeYelp(total=10)
+        self.client(self.serve(first_api), cache).reviews("b0")
+        self.client(self.serve(second_api), cache).reviews("b0")
+        self.assertEqual((len(first_api.requests), len(second_api.requests)), (1, 1))
+
+    def test_expired_entries(self):
+        api = FakeYelp(total=10)
+        cache = self.temp_cache(ttl=-1)
+        base_url = self.serve(api)
+        self.client(base_url, cache).reviews("b0")
+        self.client(base_url, cache).reviews("b0")
+        self.assertEqual(len(api.requests), 2)
+        self.assertEqual(cache.purge(), 1)
+
+
+class RetryDelayTest(unittest.TestCase):
+    @staticmethod
+    def response(retry_after):
+        return SimpleNamespace(headers={"Retry-After": retry_after})
+
+    def test_seconds(self):
+        self.assertEqual(retry_delay(self.response("3"), 0), 3.0)
+        self.assertEqual(retry_delay(self.response("3600"), 0), MAX_BACKOFF)
+
+    def test_http_date(self):
+        delay = retry_delay(self.response(formatdate(time.time() + 10, usegmt=True)), 0)
+        self.assertTrue(8 <= delay <= 10, delay)
+        self.assertEqual(retry_delay(self.response(formatdate(time.time() - 10, usegmt=True)), 0), 0.0)
+
+    def test_exponential_backoff_without_header(self):
+        delay = retry_delay(None, 3)
+        self.assertTrue(8 <= delay < 9, delay)
+
+
+if __name__ == "__main__":
+    unittest.main()